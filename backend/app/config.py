@@ -3,8 +3,7 @@ Configuration Management
 Loads environment variables and provides app configuration
 """
 
-from pydantic_settings import BaseSettings
-from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -12,6 +11,8 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./envhealth.db"
+    # Create missing tables on startup; disable where migrations manage the schema
+    AUTO_CREATE_TABLES: bool = True
     
     # API Keys (for future real API integrations)
     AIR_QUALITY_API_KEY: str = ""
@@ -29,6 +30,8 @@ class Settings(BaseSettings):
     AIRPAY_BASE_URL: str = ""
     # Domain to send as 'Referer' to Airpay (must match your registered domain)
     AIRPAY_REFERER_DOMAIN: str = "childsafeenvirons.com"
+    # Buyer email that skips payment (e.g. for QA); empty disables the bypass
+    AIRPAY_BYPASS_EMAIL: str = ""
     
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -40,13 +43,23 @@ class Settings(BaseSettings):
     APP_NAME: str = "Environmental Health Analysis Platform"
     FRONTEND_URL: str = "http://localhost:5173"  # Frontend URL for callbacks
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
-        extra = "allow"
+    # Per-source time budgets (seconds) for report generation; on expiry the
+    # report falls back to mock data for that source
+    AIR_QUALITY_TIMEOUT: float = 8.0
+    SOIL_TIMEOUT: float = 25.0
+    WATER_TIMEOUT: float = 25.0
+    
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=True,
+        extra="allow"
+    )
+
+
+# Settings are read once at import; every caller shares this instance
+_settings = Settings()
 
 
-@lru_cache()
 def get_settings() -> Settings:
     """Get cached settings instance"""
-    return Settings()
+    return _settings
@@ -1,36 +1,112 @@
 """
 Database Configuration and Session Management
-SQLAlchemy setup for PostgreSQL
+Async SQLAlchemy setup for PostgreSQL
 """
 
-from sqlalchemy import create_engine
+import logging
+from urllib.parse import parse_qsl, urlencode
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from app.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Async drivers for the sync-style URLs used in .env files
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """Map a plain DATABASE_URL onto its async driver (leaves explicit drivers alone)"""
+    scheme, sep, rest = url.partition("://")
+    scheme = ASYNC_DRIVERS.get(scheme, scheme)
+    if scheme == "postgresql+asyncpg":
+        rest = _asyncpg_query(rest)
+    return f"{scheme}{sep}{rest}"
+
+
+def _asyncpg_query(rest: str) -> str:
+    """
+    Translate libpq query parameters that asyncpg rejects
+    Hosted Postgres URLs (Render, Neon) carry ?sslmode=require, which asyncpg takes as
+    ssl=require; channel_binding has no asyncpg equivalent and is dropped
+    """
+    base, sep, query = rest.partition("?")
+    if not sep:
+        return rest
+    params = []
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        if key == "sslmode":
+            params.append(("ssl", value))
+        elif key != "channel_binding":
+            params.append((key, value))
+    return f"{base}?{urlencode(params)}" if params else base
+
 
 # Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
+# Async engines already pool connections (AsyncAdaptedQueuePool). Pre-ping guards
+# against dropped server connections; a local SQLite file cannot go stale, so it
+# skips the extra round trip on every checkout
+engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    pool_pre_ping=not settings.DATABASE_URL.startswith("sqlite"),
     echo=settings.DEBUG
 )
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False keeps attributes readable after commit without a lazy reload
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 # Create Base class for models
 Base = declarative_base()
 
 
-def get_db():
+def create_missing_tables(connection) -> None:
+    """
+    Create only the tables that do not exist yet, plus any model indexes that
+    tables created by an older schema are still missing
+    One table-name query replaces create_all's per-table existence checks
+    (run through AsyncConnection.run_sync)
+    """
+    inspector = inspect(connection)
+    existing = set(inspector.get_table_names())
+    missing = [table for name, table in Base.metadata.tables.items() if name not in existing]
+    if missing:
+        Base.metadata.create_all(bind=connection, tables=missing, checkfirst=False)
+    for name in existing & Base.metadata.tables.keys():
+        create_missing_indexes(connection, inspector, Base.metadata.tables[name])
+
+
+def create_missing_indexes(connection, inspector, table) -> None:
+    """Add indexes declared on a model that its existing table was created without"""
+    present = {index["name"] for index in inspector.get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name in present:
+            continue
+        try:
+            # Savepoint so a failure (e.g. duplicate values under a unique index)
+            # doesn't abort the surrounding startup transaction on PostgreSQL
+            with connection.begin_nested():
+                index.create(bind=connection)
+            logger.info("Created missing index %s on %s", index.name, table.name)
+        except Exception:
+            logger.exception("Could not create index %s on %s", index.name, table.name)
+
+
+async def get_db():
     """
     Database session dependency
     Use with FastAPI Depends() for automatic session management
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
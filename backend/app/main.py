@@ -13,51 +13,62 @@ backend_dir = Path(__file__).parent.parent
 if str(backend_dir) not in sys.path:
     sys.path.insert(0, str(backend_dir))
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import air_quality, soil, lifestyle, health_report, weather, water, payments
-from app.database import engine, Base
+from app.database import engine, create_missing_tables
 from app.config import get_settings
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from app.services.env_buffer import env_buffer
+from app.services.http_client import http_client
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create tables and start background writers on startup; flush and release connections on shutdown"""
+    if settings.AUTO_CREATE_TABLES:
+        async with engine.begin() as conn:
+            await conn.run_sync(create_missing_tables)
+    env_buffer.start()
+    yield
+    await http_client.aclose()
+    await env_buffer.stop()
+    await engine.dispose()
+
+
 app = FastAPI(
     title="ChildSafeEnviro API",
     description="API for the Environmental Health Monitoring platform for personalized health risk analysis",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS configuration for frontend access
-allowed_origins = [
-    "http://localhost:5173",
-    "http://localhost:5174",
-    "http://127.0.0.1:5173",
-    "http://127.0.0.1:5174",
-    "http://localhost:3000",
-    "http://127.0.0.1:3000",
-]
+# Local dev servers (Vite 5173/5174, CRA 3000) match one precompiled pattern
+local_origin_regex = r"http://(localhost|127\.0\.0\.1):(5173|5174|3000)"
+allowed_origins = set()
 
 # Add production origin from environment variable (strip trailing slash)
 frontend_url = os.getenv("FRONTEND_URL", "").rstrip("/")
 if frontend_url:
-    allowed_origins.append(frontend_url)
+    allowed_origins.add(frontend_url)
 
 # Also support comma-separated ALLOWED_ORIGINS for multiple domains
 extra_origins = os.getenv("ALLOWED_ORIGINS", "")
 if extra_origins:
     for origin in extra_origins.split(","):
         origin = origin.strip().rstrip("/")
-        if origin and origin not in allowed_origins:
-            allowed_origins.append(origin)
+        if origin:
+            allowed_origins.add(origin)
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=allowed_origins,
+    allow_origins=list(allowed_origins),
+    allow_origin_regex=local_origin_regex,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -66,13 +77,17 @@ app.add_middleware(
 
 
 # Include routers
-app.include_router(air_quality.router, prefix="/api", tags=["Air Quality"])
-app.include_router(soil.router, prefix="/api", tags=["Soil & Environment"])
-app.include_router(lifestyle.router, prefix="/api", tags=["Lifestyle"])
-app.include_router(health_report.router, prefix="/api", tags=["Health Reports"])
-app.include_router(payments.router, prefix="/api", tags=["Payments"])
-app.include_router(weather.router, prefix="/api", tags=["Weather"])
-app.include_router(water.router, prefix="/api", tags=["Water Quality"])
+ROUTERS = [
+    (air_quality, "Air Quality"),
+    (soil, "Soil & Environment"),
+    (lifestyle, "Lifestyle"),
+    (health_report, "Health Reports"),
+    (payments, "Payments"),
+    (weather, "Weather"),
+    (water, "Water Quality"),
+]
+for module, tag in ROUTERS:
+    app.include_router(module.router, prefix="/api", tags=[tag])
 
 
 @app.get("/")
@@ -85,17 +100,18 @@ async def root():
     }
 
 
+# Health payload is fixed for the life of the process, so build it once
+HEALTH_STATUS = {
+    "status": "ok",
+    "database": "connected",
+    "services": ["air_quality", "soil", "lifestyle", "health_report", "weather"],
+    "openweather_configured": bool(settings.OPENWEATHER_API_KEY)
+}
+
+
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
-    from app.config import get_settings
-    settings = get_settings()
-    
-    return {
-        "status": "ok",
-        "database": "connected",
-        "services": ["air_quality", "soil", "lifestyle", "health_report", "weather"],
-        "openweather_configured": bool(settings.OPENWEATHER_API_KEY)
-    }
+    return HEALTH_STATUS
 
 # Trigger reload
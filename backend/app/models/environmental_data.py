@@ -3,7 +3,7 @@ Environmental Data Model
 Stores air quality and soil data for locations
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -11,6 +11,9 @@ from app.database import Base
 
 class EnvironmentalData(Base):
     __tablename__ = "environmental_data"
+    __table_args__ = (
+        Index("ix_envdata_latlon", "latitude", "longitude"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -3,7 +3,7 @@ Health Report Model
 Stores generated health risk reports and recommendations
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -11,6 +11,10 @@ from app.database import Base
 
 class HealthReport(Base):
     __tablename__ = "health_reports"
+    __table_args__ = (
+        # Airpay callbacks look reports up by their transaction id
+        Index("ix_hr_stripe_session_id", "stripe_session_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
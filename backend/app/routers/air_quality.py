@@ -3,21 +3,19 @@ Air Quality Router
 API endpoints for air quality data
 """
 
+from typing import Tuple
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
 from app.schemas.air_quality import AirQualityRequest, AirQualityResponse
+from app.schemas.location import coordinates
 from app.services.air_quality_service import air_quality_service
-from app.database import get_db
-from app.models.environmental_data import EnvironmentalData
+from app.services.env_buffer import env_buffer
 
 router = APIRouter()
 
 
 @router.get("/air-quality", response_model=AirQualityResponse)
 async def get_air_quality(
-    latitude: float,
-    longitude: float,
-    db: Session = Depends(get_db)
+    coords: Tuple[float, float] = Depends(coordinates)
 ):
     """
     Get air quality data for a location
@@ -30,11 +28,7 @@ async def get_air_quality(
     risk assessment, and health recommendations.
     Uses OpenWeather Air Pollution API for real-time data.
     """
-    # Validate coordinates
-    if not -90 <= latitude <= 90:
-        raise HTTPException(status_code=400, detail="Latitude must be between -90 and 90")
-    if not -180 <= longitude <= 180:
-        raise HTTPException(status_code=400, detail="Longitude must be between -180 and 180")
+    latitude, longitude = coords
     
     # Get air quality data from service
     try:
@@ -43,8 +37,8 @@ async def get_air_quality(
         # Surface upstream API/config errors to caller
         raise HTTPException(status_code=502, detail=str(e))
     
-    # Store in database for future ML
-    env_data = EnvironmentalData(
+    # Store in database for future ML (written in batches by env_buffer)
+    await env_buffer.enqueue(dict(
         latitude=latitude,
         longitude=longitude,
         location_name=result.location_name,
@@ -56,8 +50,6 @@ async def get_air_quality(
         so2=result.data.so2,
         o3=result.data.o3,
         data_source=result.data_source
-    )
-    db.add(env_data)
-    db.commit()
+    ))
     
     return result
@@ -3,10 +3,16 @@ Health Report Router
 API endpoints for generating health risk reports
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from datetime import datetime
-from app.schemas.health_report import HealthReportRequest, HealthReportResponse
+import logging
+from fastapi import APIRouter, HTTPException, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+from app.schemas.health_report import (
+    HealthReportRequest,
+    HealthReportResponse,
+    contributing_factors_adapter,
+    health_recommendations_adapter
+)
 from app.schemas.lifestyle import LifestyleInput
 from app.services.health_report_service import health_report_service
 from app.database import get_db
@@ -14,12 +20,25 @@ from app.models.health_report import HealthReport
 from app.models.lifestyle_data import LifestyleData
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Stored lifestyle columns echoed back unchanged in the report response
+LIFESTYLE_RESPONSE_FIELDS = (
+    "name", "years_at_location", "sleep_hours", "stress_level",
+    "water_source", "uv_index", "activity_duration", "mental_health_conditions",
+    "past_health_reports", "chronic_exposure_years", "family_history", "home_environment",
+)
+
+
+def _utc_now_iso() -> str:
+    """Current UTC time as an ISO-8601 string with a 'Z' suffix"""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
 
 
 @router.post("/health-report", response_model=HealthReportResponse)
 async def generate_health_report(
     request: HealthReportRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Generate comprehensive health risk report
@@ -32,47 +51,20 @@ async def generate_health_report(
     - lifestyle_data_id: Reference to previously stored lifestyle data (optional)
     - age_range, smoking_status, etc.: Direct lifestyle inputs (alternative to ID)
     """
-    # Validate coordinates
-    if not -90 <= request.latitude <= 90:
-        raise HTTPException(status_code=400, detail="Invalid latitude")
-    if not -180 <= request.longitude <= 180:
-        raise HTTPException(status_code=400, detail="Invalid longitude")
-    
+    # Coordinates are range-checked by HealthReportRequest
     # Get lifestyle data
     lifestyle_data = None
     lifestyle_record = None
     
     if request.lifestyle_data_id:
         # Fetch from database
-        lifestyle_record = db.query(LifestyleData).filter(
-            LifestyleData.id == request.lifestyle_data_id
-        ).first()
+        lifestyle_record = await db.get(LifestyleData, request.lifestyle_data_id)
         
         if not lifestyle_record:
             raise HTTPException(status_code=404, detail="Lifestyle data not found")
         
-        # Convert to LifestyleInput for service
-        lifestyle_data = LifestyleInput(
-            name=lifestyle_record.name,
-            years_at_location=lifestyle_record.years_at_location,
-            age_range=lifestyle_record.age_range,
-            gender=lifestyle_record.gender,
-            smoking_status=lifestyle_record.smoking_status,
-            activity_level=lifestyle_record.activity_level,
-            work_environment=lifestyle_record.work_environment,
-            diet_quality=lifestyle_record.diet_quality,
-            sleep_hours=lifestyle_record.sleep_hours,
-            stress_level=lifestyle_record.stress_level,
-            medical_history=lifestyle_record.medical_history,
-            water_source=lifestyle_record.water_source,
-            uv_index=lifestyle_record.uv_index,
-            activity_duration=lifestyle_record.activity_duration,
-            mental_health_conditions=lifestyle_record.mental_health_conditions,
-            past_health_reports=lifestyle_record.past_health_reports,
-            chronic_exposure_years=lifestyle_record.chronic_exposure_years,
-            family_history=lifestyle_record.family_history,
-            home_environment=lifestyle_record.home_environment,
-        )
+        # Convert to LifestyleInput for service (reads the ORM attributes directly)
+        lifestyle_data = LifestyleInput.model_validate(lifestyle_record, from_attributes=True)
     elif request.age_range and request.smoking_status:
         # Use direct inputs
         lifestyle_data = LifestyleInput(
@@ -90,81 +82,80 @@ async def generate_health_report(
             lifestyle_data=lifestyle_data
         )
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Report generation failed")
         raise HTTPException(status_code=500, detail=f"Report generation service failed: {str(e)}")
     
+    # Fields shared by the stored HealthReport and the HealthReportResponse
+    report_fields = {
+        "risk_score": report_data["risk_score"],
+        "risk_level": report_data["risk_level"],
+        "environmental_risk": report_data["environmental_risk"],
+        "lifestyle_risk": report_data["lifestyle_risk"],
+        "report_summary": report_data["report_summary"],
+        "feature_vector": report_data["feature_vector"],
+        "version": "1.0",
+    }
+    
     # Database storage variables
     report_id = 0
     is_paid = 0
     
+    # Committed before responding so the returned report_id is always retrievable
     try:
         # Store report in database
         health_report = HealthReport(
-            risk_score=report_data["risk_score"],
-            risk_level=report_data["risk_level"],
-            environmental_risk=report_data["environmental_risk"],
-            lifestyle_risk=report_data["lifestyle_risk"],
+            **report_fields,
             combined_risk=report_data["risk_score"],
-            contributing_factors=[factor.dict() if hasattr(factor, 'dict') else factor for factor in report_data["contributing_factors"]],
-            health_recommendations=[rec.dict() if hasattr(rec, 'dict') else rec for rec in report_data["health_recommendations"]],
-            report_summary=report_data["report_summary"],
-            feature_vector=report_data["feature_vector"],
-            version="1.0"
+            contributing_factors=contributing_factors_adapter.dump_python(
+                report_data["contributing_factors"], mode="json"
+            ),
+            health_recommendations=health_recommendations_adapter.dump_python(
+                report_data["health_recommendations"], mode="json"
+            ),
+            is_paid=0
         )
         
         if lifestyle_record and hasattr(lifestyle_record, 'user_id'):
             health_report.user_id = lifestyle_record.user_id
             
         db.add(health_report)
-        db.commit()
-        db.refresh(health_report)
+        await db.commit()
         report_id = health_report.id
         is_paid = health_report.is_paid
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"ERROR SAVING REPORT: {e}")
-        db.rollback()
+        logger.exception("Error saving report: %s", e)
+        await db.rollback()
         # Fallback: report_id remains 0, which frontend should handle
     
     # Safe data extraction for response
     def get_enum_value(obj, attr):
-        val = getattr(obj, attr) if obj and hasattr(obj, attr) else None
-        return val.value if val and hasattr(val, 'value') else val
+        if obj is None:
+            return None
+        val = getattr(obj, attr, None)
+        return getattr(val, 'value', val)
 
-    # Build response
-    return HealthReportResponse(
+    personal_fields = (
+        {field: getattr(lifestyle_record, field) for field in LIFESTYLE_RESPONSE_FIELDS}
+        if lifestyle_record else {}
+    )
+
+    # Build response (validated once here, then serialized straight to JSON bytes
+    # so FastAPI doesn't dump and re-validate it against the response_model).
+    # Every field is emitted, nulls included: the frontend reads them flat
+    response = HealthReportResponse(
+        **report_fields,
+        **personal_fields,
         report_id=report_id,
-        risk_score=report_data["risk_score"],
-        risk_level=report_data["risk_level"],
-        environmental_risk=report_data["environmental_risk"],
-        lifestyle_risk=report_data["lifestyle_risk"],
-        report_summary=report_data["report_summary"],
         contributing_factors=report_data["contributing_factors"],
         health_recommendations=report_data["health_recommendations"],
         latitude=request.latitude,
         longitude=request.longitude,
         location_name=report_data["location_name"],
-        generated_at=datetime.utcnow().isoformat() + "Z",
-        version="1.0",
-        feature_vector=report_data["feature_vector"],
-        name=lifestyle_record.name if lifestyle_record else None,
-        years_at_location=lifestyle_record.years_at_location if lifestyle_record else None,
-        sleep_hours=lifestyle_record.sleep_hours if lifestyle_record else None,
-        stress_level=lifestyle_record.stress_level if lifestyle_record else None,
+        generated_at=_utc_now_iso(),
         activity_level=get_enum_value(lifestyle_record, 'activity_level') or get_enum_value(lifestyle_data, 'activity_level'),
         age_range=get_enum_value(lifestyle_record, 'age_range') or get_enum_value(lifestyle_data, 'age_range'),
         vulnerability_multiplier=report_data.get("vulnerability_multiplier", 1.0),
         is_paid=is_paid,
-        water_source=lifestyle_record.water_source if lifestyle_record else None,
-        uv_index=lifestyle_record.uv_index if lifestyle_record else None,
-        activity_duration=lifestyle_record.activity_duration if lifestyle_record else None,
-        mental_health_conditions=lifestyle_record.mental_health_conditions if lifestyle_record else None,
-        past_health_reports=lifestyle_record.past_health_reports if lifestyle_record else None,
-        chronic_exposure_years=lifestyle_record.chronic_exposure_years if lifestyle_record else None,
-        family_history=lifestyle_record.family_history if lifestyle_record else None,
-        home_environment=lifestyle_record.home_environment if lifestyle_record else None,
         short_term_considerations=report_data.get("short_term_considerations"),
         medium_term_considerations=report_data.get("medium_term_considerations"),
         long_term_considerations=report_data.get("long_term_considerations"),
@@ -173,15 +164,19 @@ async def generate_health_report(
         health_professional_guide=report_data.get("health_professional_guide"),
         support_resources=report_data.get("support_resources"),
     )
+    return Response(
+        content=response.model_dump_json(),
+        media_type="application/json"
+    )
 
 
 @router.get("/health-report/{report_id}")
 async def get_health_report(
     report_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Retrieve previously generated health report"""
-    report = db.query(HealthReport).filter(HealthReport.id == report_id).first()
+    report = await db.get(HealthReport, report_id)
     
     if not report:
         raise HTTPException(status_code=404, detail="Health report not found")
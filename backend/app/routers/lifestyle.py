@@ -4,7 +4,7 @@ API endpoints for lifestyle data collection
 """
 
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.lifestyle import LifestyleInput, LifestyleResponse
 from app.services.lifestyle_service import lifestyle_service
 from app.database import get_db
@@ -16,7 +16,7 @@ router = APIRouter()
 @router.post("/lifestyle", response_model=LifestyleResponse)
 async def submit_lifestyle_data(
     lifestyle: LifestyleInput,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Submit lifestyle data from gamified quiz
@@ -67,9 +67,10 @@ async def submit_lifestyle_data(
         quiz_responses=lifestyle.quiz_responses
     )
     
+    # The INSERT's flush assigns the primary key, and expire_on_commit=False keeps
+    # it loaded after commit, so no refresh SELECT is needed
     db.add(lifestyle_data)
-    db.commit()
-    db.refresh(lifestyle_data)
+    await db.commit()
     
     return LifestyleResponse(
         id=lifestyle_data.id,
@@ -83,10 +84,10 @@ async def submit_lifestyle_data(
 @router.get("/lifestyle/{lifestyle_id}")
 async def get_lifestyle_data(
     lifestyle_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Retrieve stored lifestyle data by ID"""
-    lifestyle_data = db.query(LifestyleData).filter(LifestyleData.id == lifestyle_id).first()
+    lifestyle_data = await db.get(LifestyleData, lifestyle_id)
     
     if not lifestyle_data:
         raise HTTPException(status_code=404, detail="Lifestyle data not found")
@@ -1,23 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Form
 from fastapi.responses import RedirectResponse, HTMLResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.config import get_settings
 from app.models.health_report import HealthReport
+from app.services.http_client import http_client
 from pydantic import BaseModel
 import hashlib
+import httpx
+import hmac
 import base64
-from datetime import datetime, timezone
-from typing import Optional
+import time
+from typing import Optional, Tuple
+from functools import lru_cache
+from cachetools import TTLCache
+import logging
 import os
 import re
 from urllib.parse import urlparse
 
 router = APIRouter()
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
-# In-memory store for pending Airpay payment data (for server-side proxy POST)
-_airpay_pending_payments = {}
+_BYPASS_EMAIL = settings.AIRPAY_BYPASS_EMAIL.strip().casefold().encode()
+
+# In-memory store for pending Airpay payment data (for server-side proxy POST).
+# Bounded with a 15 minute TTL so abandoned orders are evicted instead of leaking;
+# handlers run on the event loop thread, so no extra locking is needed.
+_airpay_pending_payments = TTLCache(maxsize=10_000, ttl=900)
 
 
 def _clean_secret(value: Optional[str]) -> str:
@@ -30,8 +42,32 @@ def _clean_secret(value: Optional[str]) -> str:
     return cleaned
 
 
+# Root-relative href/src/action attributes in Airpay's payment page HTML
+_AIRPAY_URL_FIX = re.compile(rb"""(href|src|action)=(["'])/""")
+
+
+def _rewrite_airpay_html(body: bytes) -> bytes:
+    """Point root-relative URLs in Airpay's HTML at Airpay's domain (one pass, no decode)."""
+    return _AIRPAY_URL_FIX.sub(rb"\1=\2https://payments.airpay.co.in/", body)
+
+
+async def _post_to_airpay(post_data: dict, timeout=httpx.USE_CLIENT_DEFAULT) -> Tuple[bool, httpx.Response]:
+    """POST signed form fields to Airpay on the shared client.
+
+    Returns (accepted, response); Airpay signals rejection by redirecting to an error URL.
+    """
+    resp = await http_client.client.post(AIRPAY_URL, data=post_data, timeout=timeout)
+    return "error" not in str(resp.url).lower(), resp
+
+
+@lru_cache(maxsize=1)
 def _get_airpay_creds() -> dict:
-    """Return sanitized Airpay credentials and fail fast when required values are missing."""
+    """Return sanitized Airpay credentials and fail fast when required values are missing.
+
+    Built lazily on the first payment request and shared afterwards; a failed
+    lookup raises and is not cached. Settings are read once at import, so
+    fixing the environment still needs a restart.
+    """
     creds = {
         "merchant_id": _clean_secret(settings.AIRPAY_MERCHANT_ID),
         "username": _clean_secret(settings.AIRPAY_USERNAME),
@@ -69,6 +105,45 @@ def _get_airpay_creds() -> dict:
     return creds
 
 
+@lru_cache(maxsize=4)
+def _airpay_private_key(merchant_key: str) -> str:
+    """SHA-256 private key for a merchant key; credentials are fixed, so computed once per key."""
+    creds = _get_airpay_creds()
+    raw = f"{merchant_key}@{creds['username']}:|:{creds['password']}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _airpay_skey() -> str:
+    """SHA-256 checksum helper key (username~:~password), computed once."""
+    creds = _get_airpay_creds()
+    raw = f"{creds['username']}~:~{creds['password']}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _airpay_checksum_base():
+    """SHA-256 state already fed with the constant "<skey>@" prefix."""
+    return hashlib.sha256(f"{_airpay_skey()}@".encode('utf-8'))
+
+
+def _airpay_checksum(checksum_data: str) -> str:
+    """sha256(skey@checksum_data), resuming from the cached prefix state."""
+    digest = _airpay_checksum_base().copy()
+    digest.update(checksum_data.encode('utf-8'))
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _airpay_callback_suffix() -> tuple:
+    """Constant "~:<merchant_id>~:" and "~:<secret_key>" pieces of the callback checksum."""
+    creds = _get_airpay_creds()
+    return (
+        f"~:{creds['merchant_id']}~:".encode('utf-8'),
+        f"~:{creds['secret_key']}".encode('utf-8'),
+    )
+
+
 def _is_airpay_merchant_auth_error(text: Optional[str]) -> bool:
     if not text:
         return False
@@ -140,9 +215,19 @@ def _build_domain_candidates(primary: str, fallback_urls: list) -> list:
     return final_candidates
 
 
+# Newlines/tabs inside buyer fields become spaces in a single translate pass
+_CLEAN_TABLE = str.maketrans({"\n": " ", "\r": " ", "\t": " "})
+_NON_DIGITS = re.compile(r"\D")
+
+
+def clean(s) -> str:
+    """Flatten control whitespace in a buyer field and trim the ends."""
+    return str(s).translate(_CLEAN_TABLE).strip()
+
+
 def _normalize_phone_number(raw_phone: str) -> str:
     """Normalize to a 10-digit Indian mobile number for Airpay."""
-    digits = re.sub(r"\D", "", raw_phone or "")
+    digits = _NON_DIGITS.sub("", raw_phone or "")
 
     # Handle numbers entered with country code (e.g. +91XXXXXXXXXX or 91XXXXXXXXXX)
     if len(digits) > 10 and digits.startswith("91"):
@@ -153,7 +238,7 @@ def _normalize_phone_number(raw_phone: str) -> str:
 
 def _normalize_pincode(raw_pin: str) -> str:
     """Keep only digits for pincode sent to gateway."""
-    return re.sub(r"\D", "", raw_pin or "")
+    return _NON_DIGITS.sub("", raw_pin or "")
 
 
 def _inject_airpay_base_href(html: str, base_url: str = "https://payments.airpay.co.in/") -> str:
@@ -179,10 +264,8 @@ def _inject_airpay_base_href(html: str, base_url: str = "https://payments.airpay
 
     return f"<head>{base_tag}</head>{html}"
 
-def _get_airpay_url() -> str:
-    """Return the Airpay payment endpoint URL (allow override via env)."""
-    base = _clean_secret(getattr(settings, "AIRPAY_BASE_URL", "")) or "https://payments.airpay.co.in/pay/index.php"
-    return base
+# Airpay payment endpoint URL (allow override via env); settings are fixed for the process
+AIRPAY_URL = _clean_secret(getattr(settings, "AIRPAY_BASE_URL", "")) or "https://payments.airpay.co.in/pay/index.php"
 
 class AirpayOrderRequest(BaseModel):
     report_id: int
@@ -197,17 +280,17 @@ class AirpayOrderRequest(BaseModel):
     buyerPinCode: str
 
 @router.post("/create-airpay-order")
-async def create_airpay_order(request: AirpayOrderRequest, http_request: Request, db: Session = Depends(get_db)):
+async def create_airpay_order(request: AirpayOrderRequest, http_request: Request, db: AsyncSession = Depends(get_db)):
     creds = _get_airpay_creds()
 
-    report = db.query(HealthReport).filter(HealthReport.id == request.report_id).first()
+    report = await db.get(HealthReport, request.report_id)
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     
-    # Bypass for specific email
-    if request.buyerEmail.lower() == "abhyammath78@gmail.com":
+    # Bypass for the configured email (disabled when AIRPAY_BYPASS_EMAIL is empty)
+    if _BYPASS_EMAIL and hmac.compare_digest(request.buyerEmail.strip().casefold().encode(), _BYPASS_EMAIL):
         report.is_paid = 1
-        db.commit()
+        await db.commit()
         return {
             "is_bypassed": True,
             "message": "Payment bypassed for special user",
@@ -215,9 +298,6 @@ async def create_airpay_order(request: AirpayOrderRequest, http_request: Request
         }
 
     # Normalize inputs (strip and clean internal whitespaces)
-    def clean(s):
-        return str(s).strip().replace("\n", " ").replace("\r", " ").replace("\t", " ")
-        
     buyer_email = clean(request.buyerEmail)
     buyer_fname = clean(request.buyerFirstName)
     buyer_lname = clean(request.buyerLastName)
@@ -238,7 +318,7 @@ async def create_airpay_order(request: AirpayOrderRequest, http_request: Request
         raise HTTPException(status_code=400, detail="Invalid PIN code. Enter at least 6 digits.")
 
     amount = "95.00"
-    orderid = f"REP{report.id}T{int(datetime.now(timezone.utc).timestamp())}"
+    orderid = f"REP{report.id}T{int(time.time())}"
 
     # Airpay requires a registered merchant domain in Base64 (mer_dom).
     # Build a robust candidate list to handle accounts registered with/without www.
@@ -258,54 +338,40 @@ async def create_airpay_order(request: AirpayOrderRequest, http_request: Request
             detail="Airpay domain is not configured. Set AIRPAY_REFERER_DOMAIN to your registered public domain.",
         )
     report.stripe_session_id = orderid
-    db.commit()
-    
-    date = datetime.now().strftime("%Y-%m-%d")
+
+    date = time.strftime("%Y-%m-%d")
     
-    # 2. Checksum helper key (SHA256): username~:~password
-    _skey_raw = f"{creds['username']}~:~{creds['password']}"
-    s_key = hashlib.sha256(_skey_raw.encode('utf-8')).hexdigest()
+    # 2. Checksum over buyer fields, keyed with sha256(username~:~password)
     checksum_data = (
-        buyer_email
-        + buyer_fname
-        + buyer_lname
-        + address
-        + buyer_city
-        + buyer_state
-        + buyer_country
-        + amount
-        + orderid
-        + date
+        f"{buyer_email}{buyer_fname}{buyer_lname}{address}{buyer_city}"
+        f"{buyer_state}{buyer_country}{amount}{orderid}{date}"
     )
 
     def _build_post_data(merchant_key: str, mer_dom_value: str):
-        _private_key_raw_string = f"{merchant_key}@{creds['username']}:|:{creds['password']}"
-        private_key = hashlib.sha256(_private_key_raw_string.encode('utf-8')).hexdigest()
-        _checksum_raw_input_create = f"{s_key}@{checksum_data}"
-        checksum = hashlib.sha256(_checksum_raw_input_create.encode('utf-8')).hexdigest()
-
-        from collections import OrderedDict
-        return OrderedDict([
-            ("mercid",         creds["merchant_id"]),
-            ("mer_dom",        mer_dom_value),
-            ("orderid",        orderid),
-            ("amount",         amount),
-            ("currency",       "356"),
-            ("buyerEmail",     buyer_email),
-            ("buyerPhone",     buyer_phone),
-            ("buyerFirstName", buyer_fname),
-            ("buyerLastName",  buyer_lname),
-            ("buyerAddress",   address),
-            ("buyerCity",      buyer_city),
-            ("buyerState",     buyer_state),
-            ("buyerCountry",   buyer_country),
-            ("buyerPinCode",   buyer_pin),
-            ("privatekey",     private_key),
-            ("checksum",       checksum),
-            ("date",           date),
-            ("isocurrency",    "INR"),
-            ("clientid",       creds["client_id"])
-        ])
+        private_key = _airpay_private_key(merchant_key)
+        checksum = _airpay_checksum(checksum_data)
+
+        return {
+            "mercid":         creds["merchant_id"],
+            "mer_dom":        mer_dom_value,
+            "orderid":        orderid,
+            "amount":         amount,
+            "currency":       "356",
+            "buyerEmail":     buyer_email,
+            "buyerPhone":     buyer_phone,
+            "buyerFirstName": buyer_fname,
+            "buyerLastName":  buyer_lname,
+            "buyerAddress":   address,
+            "buyerCity":      buyer_city,
+            "buyerState":     buyer_state,
+            "buyerCountry":   buyer_country,
+            "buyerPinCode":   buyer_pin,
+            "privatekey":     private_key,
+            "checksum":       checksum,
+            "date":           date,
+            "isocurrency":    "INR",
+            "clientid":       creds["client_id"],
+        }
 
     # Stable flow: return signed fields so browser can do a top-level form POST to Airpay.
     # This avoids document.write/cross-origin script failures in localhost.
@@ -317,20 +383,24 @@ async def create_airpay_order(request: AirpayOrderRequest, http_request: Request
         raise HTTPException(status_code=500, detail="Airpay merchant key is missing.")
 
     post_data = _build_post_data(merchant_key, mer_dom)
+    await db.commit()
 
     return {
         "is_bypassed": False,
         "transaction_id": orderid,
-        "post_url": _get_airpay_url(),
+        "post_url": AIRPAY_URL,
         "domain_used": preferred_domain,
-        "form_fields": dict(post_data),
+        "form_fields": post_data,
     }
 
 
 @router.get("/payment-transactions/recent")
-async def get_recent_transactions(limit: int = 20, db: Session = Depends(get_db)):
+async def get_recent_transactions(limit: int = 20, db: AsyncSession = Depends(get_db)):
     """Return recent payment transactions for testing and debugging."""
-    reports = db.query(HealthReport).order_by(HealthReport.created_at.desc()).limit(limit).all()
+    result = await db.execute(
+        select(HealthReport).order_by(HealthReport.created_at.desc()).limit(limit)
+    )
+    reports = result.scalars().all()
     return {
         "total": len([r for r in reports if r.stripe_session_id]),
         "transactions": [
@@ -346,9 +416,9 @@ async def get_recent_transactions(limit: int = 20, db: Session = Depends(get_db)
 
 
 @router.get("/payment-transaction/{report_id}")
-async def get_payment_transaction(report_id: int, db: Session = Depends(get_db)):
+async def get_payment_transaction(report_id: int, db: AsyncSession = Depends(get_db)):
     """Return the latest generated Airpay transaction id for a report."""
-    report = db.query(HealthReport).filter(HealthReport.id == report_id).first()
+    report = await db.get(HealthReport, report_id)
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
 
@@ -359,6 +429,12 @@ async def get_payment_transaction(report_id: int, db: Session = Depends(get_db))
         "created_at": report.created_at.isoformat() if report.created_at else None,
     }
 
+# Where the Airpay callback sends the browser back to (frontend report page)
+_REPORT_URL = os.getenv("FRONTEND_URL", "http://localhost:5173") + "/report"
+PAYMENT_SUCCESS_URL = f"{_REPORT_URL}?payment=success"
+PAYMENT_FAILED_URL = f"{_REPORT_URL}?payment=failed"
+
+
 @router.post("/airpay-callback")
 async def airpay_callback(
     TRANSACTIONID: str = Form(...),
@@ -369,29 +445,34 @@ async def airpay_callback(
     TRANSACTIONTIME: str = Form(...),
     CUSTOMVAR: Optional[str] = Form(None),
     CHECKSUM: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    creds = _get_airpay_creds()
+    # Verify checksum: md5(status~:txn~:aptxn~:amount~:time~:message~:merchant~:customvar~:secret)
+    merchant_part, secret_part = _airpay_callback_suffix()
+    digest = hashlib.md5(
+        f"{TRANSACTIONSTATUS}~:{TRANSACTIONID}~:{APTRANSACTIONID}~:{AMOUNT}~:{TRANSACTIONTIME}~:{MESSAGE}".encode('utf-8')
+    )
+    digest.update(merchant_part)
+    digest.update((CUSTOMVAR or "").encode('utf-8'))
+    digest.update(secret_part)
+    calculated_checksum = digest.hexdigest()
 
-    # Verify checksum
-    custom_var = CUSTOMVAR if CUSTOMVAR else ""
-    checksum_string = f"{TRANSACTIONSTATUS}~:{TRANSACTIONID}~:{APTRANSACTIONID}~:{AMOUNT}~:{TRANSACTIONTIME}~:{MESSAGE}~:{creds['merchant_id']}~:{custom_var}~:{creds['secret_key']}"
-    calculated_checksum = hashlib.md5(checksum_string.encode('utf-8')).hexdigest()
-    
-    # Get frontend URL from environment or default to localhost
-    frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173") + "/report"
+    # Reject forged or corrupted callbacks before touching the database
+    if not hmac.compare_digest(calculated_checksum.encode(), CHECKSUM.strip().lower().encode("utf-8")):
+        logger.warning("Airpay callback checksum mismatch for transaction %s", TRANSACTIONID)
+        return RedirectResponse(url=PAYMENT_FAILED_URL, status_code=303)
 
     # Update report status if success
     if TRANSACTIONSTATUS == "200":
-        report = db.query(HealthReport).filter(HealthReport.stripe_session_id == TRANSACTIONID).first()
+        report = await db.scalar(
+            select(HealthReport).where(HealthReport.stripe_session_id == TRANSACTIONID)
+        )
         if report:
             report.is_paid = 1
-            db.commit()
-            return RedirectResponse(url=f"{frontend_url}?payment=success", status_code=303)
-    
-        return RedirectResponse(url=f"{frontend_url}?payment=failed", status_code=303)
+            await db.commit()
+            return RedirectResponse(url=PAYMENT_SUCCESS_URL, status_code=303)
 
-    return RedirectResponse(url=f"{frontend_url}?payment=failed", status_code=303)
+    return RedirectResponse(url=PAYMENT_FAILED_URL, status_code=303)
 
 
 @router.get("/airpay-proxy/{orderid}")
@@ -400,34 +481,18 @@ async def airpay_proxy(orderid: str):
     Server-side proxy: POSTs to Airpay from the backend (bypasses browser encoding issue).
     The browser opens this URL, backend POSTs to Airpay, returns the payment page HTML.
     """
-    import urllib.request
-    import urllib.parse
-    
     post_data = _airpay_pending_payments.pop(orderid, None)
     if not post_data:
         return HTMLResponse(content="<h2>Error: Payment session expired or not found.</h2>", status_code=404)
     
-    # POST to Airpay from the SERVER (Python urllib works, browser form POST doesn't)
-    encoded = urllib.parse.urlencode(post_data).encode()
-    req = urllib.request.Request(_get_airpay_url(), data=encoded)
-    
+    # POST to Airpay from the SERVER (server-side POST works, browser form POST doesn't)
+    # Uses the shared pooled client; form fields keep their order
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            body = resp.read().decode('utf-8', errors='replace')
-            final_url = resp.url
-            
-            if "error" in final_url.lower():
-                return HTMLResponse(content=body)
-            else:
-                # Serve the Airpay payment page HTML to the browser
-                # Fix relative URLs in the HTML to point to Airpay's domain
-                body = body.replace('href="/', 'href="https://payments.airpay.co.in/')
-                body = body.replace("href='/", "href='https://payments.airpay.co.in/")
-                body = body.replace('src="/', 'src="https://payments.airpay.co.in/')
-                body = body.replace("src='/", "src='https://payments.airpay.co.in/")
-                body = body.replace('action="/', 'action="https://payments.airpay.co.in/')
-                body = body.replace("action='/", "action='https://payments.airpay.co.in/")
-                return HTMLResponse(content=body)
+        accepted, resp = await _post_to_airpay(post_data)
+        if not accepted:
+            return HTMLResponse(content=resp.content)
+        # Serve the Airpay payment page HTML to the browser as raw bytes
+        return HTMLResponse(content=_rewrite_airpay_html(resp.content))
     except Exception as e:
         return HTMLResponse(content=f"<h2>Payment Error</h2><p>{str(e)}</p>", status_code=500)
 
@@ -436,13 +501,9 @@ async def test_airpay_form():
     """Server-side proxy: POSTs to Airpay from the backend (bypasses browser encoding issue)."""
     creds = _get_airpay_creds()
 
-    import urllib.request
-    import urllib.parse
-    from datetime import timezone
-    
     amount = "95.00"
-    orderid = f"BTEST{int(datetime.now(timezone.utc).timestamp())}"
-    date = datetime.now().strftime("%Y-%m-%d")
+    orderid = f"BTEST{int(time.time())}"
+    date = time.strftime("%Y-%m-%d")
 
     # Airpay requires merchant domain in Base64 (mer_dom).
     # Use settings if available, else hardcoded fallback.
@@ -451,63 +512,41 @@ async def test_airpay_form():
     mer_dom = base64.b64encode(merchant_domain.encode("utf-8")).decode("ascii")
 
     # Private key using SECRET_KEY (which has fallback to API_KEY in _get_airpay_creds)
-    private_key = hashlib.sha256(
-        f"{creds['secret_key']}@{creds['username']}:|:{creds['password']}".encode('utf-8')
-    ).hexdigest()
+    private_key = _airpay_private_key(creds['secret_key'])
 
     # Checksum using SHA256 (same as create_airpay_order)
-    _skey_raw = f"{creds['username']}~:~{creds['password']}"
-    s_key = hashlib.sha256(_skey_raw.encode('utf-8')).hexdigest()
-
-    checksum_data = (
-        "test@example.com"
-        + "Test"
-        + "User"
-        + "123 Main St"
-        + "Mumbai"
-        + "Maharashtra"
-        + "India"
-        + amount
-        + orderid
-        + date
-    )
-    checksum = hashlib.sha256(
-        f"{s_key}@{checksum_data}".encode('utf-8')
-    ).hexdigest()
-
-    from collections import OrderedDict
-    post_data = OrderedDict([
-        ("mercid",         creds["merchant_id"]),
-        ("mer_dom",        mer_dom),
-        ("orderid",        orderid),
-        ("amount",         amount),
-        ("currency",       "356"),
-        ("buyerEmail",     "test@example.com"),
-        ("buyerPhone",     "9876543210"),
-        ("buyerFirstName", "Test"),
-        ("buyerLastName",  "User"),
-        ("buyerAddress",   "123 Main St"),
-        ("buyerCity",      "Mumbai"),
-        ("buyerState",     "Maharashtra"),
-        ("buyerCountry",   "India"),
-        ("buyerPinCode",   "400001"),
-        ("privatekey",     private_key),
-        ("checksum",       checksum),
-        ("date",           date),
-        ("isocurrency",    "INR")
-    ])
+    checksum_data = f"test@example.comTestUser123 Main StMumbaiMaharashtraIndia{amount}{orderid}{date}"
+    checksum = _airpay_checksum(checksum_data)
+
+    post_data = {
+        "mercid":         creds["merchant_id"],
+        "mer_dom":        mer_dom,
+        "orderid":        orderid,
+        "amount":         amount,
+        "currency":       "356",
+        "buyerEmail":     "test@example.com",
+        "buyerPhone":     "9876543210",
+        "buyerFirstName": "Test",
+        "buyerLastName":  "User",
+        "buyerAddress":   "123 Main St",
+        "buyerCity":      "Mumbai",
+        "buyerState":     "Maharashtra",
+        "buyerCountry":   "India",
+        "buyerPinCode":   "400001",
+        "privatekey":     private_key,
+        "checksum":       checksum,
+        "date":           date,
+        "isocurrency":    "INR",
+    }
     
     # POST to Airpay from the SERVER (this works, unlike browser POST)
-    encoded = urllib.parse.urlencode(post_data).encode()
-    req = urllib.request.Request(_get_airpay_url(), data=encoded)
-    
     try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            body = resp.read().decode('utf-8', errors='replace')
-            final_url = resp.url
-            
-            if "error" in final_url.lower():
-                return HTMLResponse(content=f"""
+        accepted, resp = await _post_to_airpay(post_data, timeout=15.0)
+        body = resp.text
+        final_url = str(resp.url)
+        
+        if not accepted:
+            return HTMLResponse(content=f"""
         <h2>❌ FAILED</h2>
         <p><strong>Final URL:</strong> {final_url}</p>
         <p><strong>Merchant ID:</strong> {settings.AIRPAY_MERCHANT_ID}</p>
@@ -520,7 +559,7 @@ async def test_airpay_form():
         <hr/>
         <pre>{body[:3000]}</pre>
     """)
-            else:
-                return HTMLResponse(content=f"<h2>SUCCESS! Payment page loaded.</h2><p>URL: {final_url}</p><p>The server-side POST works. Now applying this to the main flow...</p>")
+        else:
+            return HTMLResponse(content=f"<h2>SUCCESS! Payment page loaded.</h2><p>URL: {final_url}</p><p>The server-side POST works. Now applying this to the main flow...</p>")
     except Exception as e:
         return HTMLResponse(content=f"<h2>Error</h2><pre>{str(e)}</pre>")
@@ -3,8 +3,13 @@ Soil Data Router
 API endpoints for soil and environmental data
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
+import random
+from functools import lru_cache
+from typing import Tuple
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.location import coordinates
 from app.schemas.soil import SoilDataRequest, SoilDataResponse
 from app.services.soil_service import soil_service
 from app.services.perplexity_soil_service import perplexity_soil_service
@@ -13,12 +18,26 @@ from app.models.environmental_data import EnvironmentalData
 
 router = APIRouter()
 
+# Built once; served by the (latitude, longitude) index on environmental_data
+SOIL_LOOKUP = (
+    select(EnvironmentalData)
+    .where(
+        EnvironmentalData.latitude == bindparam("latitude"),
+        EnvironmentalData.longitude == bindparam("longitude"),
+    )
+    .limit(1)
+)
+
+# Value pools for the mock soil fallback
+MOCK_SOIL_TYPES = ("clay", "loam", "sandy", "silt", "laterite")
+MOCK_NUTRIENT_LEVELS = ("low", "moderate", "high")
+MOCK_RISK_LEVELS = ("low", "medium", "high")
+
 
 @router.get("/soil-data", response_model=SoilDataResponse)
 async def get_soil_data(
-    latitude: float,
-    longitude: float,
-    db: Session = Depends(get_db)
+    coords: Tuple[float, float] = Depends(coordinates),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get soil and environmental data for a location
@@ -30,20 +49,16 @@ async def get_soil_data(
     Returns soil properties, contamination risk, health impacts,
     and safety recommendations.
     """
-    # Validate coordinates
-    if not -90 <= latitude <= 90:
-        raise HTTPException(status_code=400, detail="Latitude must be between -90 and 90")
-    if not -180 <= longitude <= 180:
-        raise HTTPException(status_code=400, detail="Longitude must be between -180 and 180")
+    latitude, longitude = coords
     
     # Get soil data from service
     result = soil_service.get_soil_data(latitude, longitude)
     
     # Update or create environmental data record
-    env_data = db.query(EnvironmentalData).filter(
-        EnvironmentalData.latitude == latitude,
-        EnvironmentalData.longitude == longitude
-    ).first()
+    existing = await db.execute(
+        SOIL_LOOKUP, {"latitude": latitude, "longitude": longitude}
+    )
+    env_data = existing.scalars().first()
     
     if env_data:
         env_data.soil_type = result.properties.soil_type
@@ -61,15 +76,14 @@ async def get_soil_data(
         )
         db.add(env_data)
     
-    db.commit()
+    await db.commit()
     
     return result
 
 
 @router.get("/soil-research")
 async def research_soil_data(
-    latitude: float = Query(..., description="Latitude coordinate"),
-    longitude: float = Query(..., description="Longitude coordinate"),
+    coords: Tuple[float, float] = Depends(coordinates),
     city: str = Query(None, description="City name"),
     state: str = Query(None, description="State/region name"),
     country: str = Query(None, description="Country name")
@@ -89,11 +103,11 @@ async def research_soil_data(
     
     Returns comprehensive soil analysis with health implications
     """
-    # Validate coordinates
-    if not -90 <= latitude <= 90:
-        raise HTTPException(status_code=400, detail="Latitude must be between -90 and 90")
-    if not -180 <= longitude <= 180:
-        raise HTTPException(status_code=400, detail="Longitude must be between -180 and 180")
+    latitude, longitude = coords
+    
+    if not perplexity_soil_service.api_key:
+        # Keyless deployments go straight to the mock rather than raising per request
+        return _generate_enhanced_mock_soil_data(latitude, longitude, city, state, country)
     
     try:
         result = await perplexity_soil_service.research_soil_data(
@@ -116,11 +130,16 @@ async def research_soil_data(
 
 def _generate_enhanced_mock_soil_data(latitude: float, longitude: float, city: str = None, state: str = None, country: str = None):
     """Generate realistic mock soil data when Perplexity API is unavailable"""
-    import random
-    
-    # Seed with location for consistency
-    seed = int((abs(latitude) + abs(longitude)) * 1000)
-    random.seed(seed)
+    # Quantize to ~100 m so nearby lookups share a cache entry; echo the exact coordinates back
+    cached = _generate_enhanced_mock_soil_data_cached(round(latitude, 3), round(longitude, 3), city, state, country)
+    return {**cached, "coordinates": {"latitude": latitude, "longitude": longitude}}
+
+
+@lru_cache(maxsize=4096)
+def _generate_enhanced_mock_soil_data_cached(latitude: float, longitude: float, city: str = None, state: str = None, country: str = None):
+    """Deterministic mock soil payload for a quantized location (shared, do not mutate)"""
+    # Local RNG seeded per location: consistent output, distinct for (a, b) vs (b, a)
+    rng = random.Random(hash((round(latitude, 4), round(longitude, 4))) & 0xFFFFFFFF)
     
     location_parts = []
     if city:
@@ -131,16 +150,15 @@ def _generate_enhanced_mock_soil_data(latitude: float, longitude: float, city: s
         location_parts.append(country)
     location_str = ", ".join(location_parts) if location_parts else f"coordinates {latitude}, {longitude}"
     
-    # Generate realistic soil data based on latitude
-    soil_types = ["clay", "loam", "sandy", "silt", "laterite"]
-    soil_type = random.choice(soil_types)
+    # Generate realistic soil data based on location
+    soil_type = rng.choice(MOCK_SOIL_TYPES)
     
-    ph = round(random.uniform(5.5, 8.5), 1)
-    nitrogen = random.choice(["low", "moderate", "high"])
-    phosphorus = random.choice(["low", "moderate", "high"])
-    potassium = random.choice(["low", "moderate", "high"])
+    ph = round(rng.uniform(5.5, 8.5), 1)
+    nitrogen = rng.choice(MOCK_NUTRIENT_LEVELS)
+    phosphorus = rng.choice(MOCK_NUTRIENT_LEVELS)
+    potassium = rng.choice(MOCK_NUTRIENT_LEVELS)
     
-    contamination_risk = random.choice(["low", "medium", "high"])
+    contamination_risk = rng.choice(MOCK_RISK_LEVELS)
     
     health_implications = []
     if ph < 6.0:
@@ -3,8 +3,10 @@ Weather Router
 API endpoints for weather data
 """
 
-from fastapi import APIRouter, HTTPException
-from app.schemas.weather import WeatherResponse
+from typing import Tuple
+from fastapi import APIRouter, HTTPException, Depends
+from app.schemas.location import coordinates
+from app.schemas.weather import WeatherResponse, WeatherData
 from app.services.weather_service import weather_service
 
 router = APIRouter()
@@ -12,8 +14,7 @@ router = APIRouter()
 
 @router.get("/weather", response_model=WeatherResponse)
 async def get_weather(
-    latitude: float,
-    longitude: float
+    coords: Tuple[float, float] = Depends(coordinates)
 ):
     """
     Get current weather data for a location
@@ -25,18 +26,13 @@ async def get_weather(
     Returns current weather conditions including temperature, humidity,
     wind speed, and weather description from OpenWeather API.
     """
-    # Validate coordinates
-    if not -90 <= latitude <= 90:
-        raise HTTPException(status_code=400, detail="Latitude must be between -90 and 90")
-    if not -180 <= longitude <= 180:
-        raise HTTPException(status_code=400, detail="Longitude must be between -180 and 180")
+    latitude, longitude = coords
     
     try:
         # Get weather data from service
         weather_data = await weather_service.get_weather(latitude, longitude)
         
         # Build response
-        from app.schemas.weather import WeatherData
         return WeatherResponse(
             latitude=latitude,
             longitude=longitude,
@@ -3,14 +3,15 @@ Air Quality Schemas
 Request and response models for air quality data
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
+from app.schemas.location import Latitude, Longitude
 
 
 class AirQualityRequest(BaseModel):
     """Request for air quality data"""
-    latitude: float = Field(..., ge=-90, le=90)
-    longitude: float = Field(..., ge=-180, le=180)
+    latitude: Latitude
+    longitude: Longitude
 
 
 class AirQualityData(BaseModel):
@@ -35,8 +36,8 @@ class AirQualityResponse(BaseModel):
     primary_pollutant: str
     data_source: str = "mock"
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "latitude": 40.7128,
                 "longitude": -74.0060,
@@ -56,3 +57,4 @@ class AirQualityResponse(BaseModel):
                 "data_source": "mock"
             }
         }
+    )
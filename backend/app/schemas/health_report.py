@@ -3,14 +3,15 @@ Health Report Schemas
 Request and response models for health report generation
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from typing import List, Dict, Any, Optional
+from app.schemas.location import Latitude, Longitude
 
 
 class HealthReportRequest(BaseModel):
     """Request to generate health report"""
-    latitude: float = Field(..., ge=-90, le=90)
-    longitude: float = Field(..., ge=-180, le=180)
+    latitude: Latitude
+    longitude: Longitude
     lifestyle_data_id: Optional[int] = Field(None, description="Reference to stored lifestyle data")
     
     # Or embed lifestyle data directly
@@ -19,14 +20,15 @@ class HealthReportRequest(BaseModel):
     activity_level: Optional[str] = None
     work_environment: Optional[str] = None
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "latitude": 40.7128,
                 "longitude": -74.0060,
                 "lifestyle_data_id": 1
             }
         }
+    )
 
 
 class ContributingFactor(BaseModel):
@@ -119,8 +121,8 @@ class HealthReportResponse(BaseModel):
     health_professional_guide: Optional[List[str]] = None
     support_resources: Optional[List[str]] = None
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "report_id": 1,
                 "risk_score": 42.5,
@@ -163,3 +165,9 @@ class HealthReportResponse(BaseModel):
                 "version": "1.0"
             }
         }
+    )
+
+
+# List adapters built at import; used to dump report lists for the JSON columns
+contributing_factors_adapter = TypeAdapter(List[ContributingFactor])
+health_recommendations_adapter = TypeAdapter(List[HealthRecommendation])
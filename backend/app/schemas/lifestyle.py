@@ -3,8 +3,9 @@ Lifestyle Schemas
 Request and response models for lifestyle/quiz data
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from functools import cached_property
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Dict, Any, Tuple
 from enum import Enum
 
 
@@ -75,9 +76,14 @@ class LifestyleInput(BaseModel):
 
     # Store all quiz responses
     quiz_responses: Optional[Dict[str, Any]] = None
+
+    @cached_property
+    def conditions_lower(self) -> Tuple[str, ...]:
+        """Lowercased medical history, computed once for keyword matching"""
+        return tuple(c.lower() for c in self.medical_history or ())
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "age_range": "26-35",
                 "gender": "female",
@@ -93,6 +99,7 @@ class LifestyleInput(BaseModel):
                 }
             }
         }
+    )
 
 
 class LifestyleResponse(BaseModel):
@@ -103,8 +110,8 @@ class LifestyleResponse(BaseModel):
     risk_factors: list[str]
     positive_factors: list[str]
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "id": 1,
                 "message": "Lifestyle data saved successfully",
@@ -117,3 +124,4 @@ class LifestyleResponse(BaseModel):
                 ]
             }
         }
+    )
@@ -3,30 +3,33 @@ Location Schema
 Validates latitude and longitude inputs
 """
 
-from pydantic import BaseModel, Field, validator
+from typing import Annotated, Tuple
+from fastapi import Query
+from pydantic import BaseModel, ConfigDict, Field
+
+# Shared coordinate types, reused by every request schema
+Latitude = Annotated[float, Field(ge=-90, le=90, description="Latitude (-90 to 90)")]
+Longitude = Annotated[float, Field(ge=-180, le=180, description="Longitude (-180 to 180)")]
 
 
 class LocationInput(BaseModel):
     """Location coordinates input"""
-    latitude: float = Field(..., ge=-90, le=90, description="Latitude (-90 to 90)")
-    longitude: float = Field(..., ge=-180, le=180, description="Longitude (-180 to 180)")
-    
-    @validator('latitude')
-    def validate_latitude(cls, v):
-        if not -90 <= v <= 90:
-            raise ValueError('Latitude must be between -90 and 90')
-        return v
-    
-    @validator('longitude')
-    def validate_longitude(cls, v):
-        if not -180 <= v <= 180:
-            raise ValueError('Longitude must be between -180 and 180')
-        return v
+    latitude: Latitude
+    longitude: Longitude
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "latitude": 40.7128,
                 "longitude": -74.0060
             }
         }
+    )
+
+
+def coordinates(
+    latitude: float = Query(..., ge=-90, le=90, description="Latitude (-90 to 90)"),
+    longitude: float = Query(..., ge=-180, le=180, description="Longitude (-180 to 180)")
+) -> Tuple[float, float]:
+    """Query-parameter dependency returning range-checked (latitude, longitude)"""
+    return latitude, longitude
@@ -3,14 +3,19 @@ Soil and Environment Schemas
 Request and response models for soil data
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field
+from typing import Annotated, Optional, List
+from app.schemas.location import Latitude, Longitude
+
+
+# Risk labels are normalised to lowercase once at parse time so scoring can use them as-is
+RiskLevel = Annotated[str, AfterValidator(str.lower)]
 
 
 class SoilDataRequest(BaseModel):
     """Request for soil data"""
-    latitude: float = Field(..., ge=-90, le=90)
-    longitude: float = Field(..., ge=-180, le=180)
+    latitude: Latitude
+    longitude: Longitude
 
 
 class SoilProperties(BaseModel):
@@ -18,7 +23,7 @@ class SoilProperties(BaseModel):
     soil_type: str = Field(..., description="Type of soil (clay/sandy/loam/silt)")
     ph: float = Field(..., description="Soil pH level (0-14)")
     organic_matter: float = Field(..., description="Organic matter percentage")
-    contamination_risk: str = Field(..., description="low/medium/high")
+    contamination_risk: RiskLevel = Field(..., description="low/medium/high")
 
 
 class SoilDataResponse(BaseModel):
@@ -32,8 +37,8 @@ class SoilDataResponse(BaseModel):
     recommendations: List[str]
     data_source: str = "mock"
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "latitude": 40.7128,
                 "longitude": -74.0060,
@@ -56,3 +61,4 @@ class SoilDataResponse(BaseModel):
                 "data_source": "mock"
             }
         }
+    )
@@ -4,10 +4,12 @@ Water Quality Schemas
 
 from pydantic import BaseModel
 from typing import List, Optional, Dict
+from app.schemas.location import Latitude, Longitude
+from app.schemas.soil import RiskLevel
 
 class WaterDataRequest(BaseModel):
-    latitude: float
-    longitude: float
+    latitude: Latitude
+    longitude: Longitude
 
 class WaterDataResponse(BaseModel):
     location: str
@@ -18,7 +20,7 @@ class WaterDataResponse(BaseModel):
     ph: Optional[float] = None
     hardness: Optional[str] = None # Soft, Moderate, Hard
     lead_risk: Optional[str] = None # Low, Medium, High
-    contamination_risk: Optional[str] = None
+    contamination_risk: Optional[RiskLevel] = None
     
     # Analysis
     health_implications: List[str] = []
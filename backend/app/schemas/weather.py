@@ -3,14 +3,15 @@ Weather Schemas
 Request and response models for weather data
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
+from app.schemas.location import Latitude, Longitude
 
 
 class WeatherRequest(BaseModel):
     """Request for weather data"""
-    latitude: float = Field(..., ge=-90, le=90)
-    longitude: float = Field(..., ge=-180, le=180)
+    latitude: Latitude
+    longitude: Longitude
 
 
 class WeatherData(BaseModel):
@@ -36,8 +37,8 @@ class WeatherResponse(BaseModel):
     timestamp: int = Field(..., description="Unix timestamp")
     data_source: str = "openweather"
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "latitude": 40.7128,
                 "longitude": -74.0060,
@@ -58,3 +59,4 @@ class WeatherResponse(BaseModel):
                 "data_source": "openweather"
             }
         }
+    )
@@ -2,6 +2,7 @@ import json
 import asyncio
 import os
 import httpx
+import orjson
 from typing import Dict, Any, Optional
 from datetime import datetime
 
@@ -12,6 +13,7 @@ except ImportError:
     pass  
 
 from app.config import get_settings
+from app.services.http_client import http_client
 
 settings = get_settings()
 
@@ -182,35 +184,36 @@ Season       : {season}
             "response_format": {"type": "json_object"},
         }
 
+        body = orjson.dumps(payload)  # serialized once, reused across retries
+
         last_error: Optional[Exception] = None
         for attempt in range(1, self.MAX_RETRIES + 1):
             try:
-                async with httpx.AsyncClient(timeout=httpx.Timeout(45.0)) as client:
-                    r = await client.post(self.OPENAI_URL, headers=headers, json=payload)
-
-                    
-                    if r.status_code in (429, 500, 502, 503, 504):
-                        retry_after = float(r.headers.get("Retry-After", self.RETRY_BASE_DELAY * attempt))
-                        if attempt < self.MAX_RETRIES:
-                            print(f"[AI Report] {section_name} attempt {attempt} → HTTP {r.status_code}, retrying in {retry_after:.1f}s")
-                            await asyncio.sleep(retry_after)
-                            continue
-                        r.raise_for_status()
-
+                r = await http_client.client.post(
+                    self.OPENAI_URL, headers=headers, content=body, timeout=45.0
+                )
+
+                if r.status_code in (429, 500, 502, 503, 504):
+                    retry_after = float(r.headers.get("Retry-After", self.RETRY_BASE_DELAY * attempt))
+                    if attempt < self.MAX_RETRIES:
+                        print(f"[AI Report] {section_name} attempt {attempt} → HTTP {r.status_code}, retrying in {retry_after:.1f}s")
+                        await asyncio.sleep(retry_after)
+                        continue
                     r.raise_for_status()
-                    data = r.json()
-
-                   
-                    usage = data.get("usage", {})
-                    if usage:
-                        print(
-                            f"[AI Report] {section_name} tokens — "
-                            f"prompt: {usage.get('prompt_tokens', '?')}, "
-                            f"completion: {usage.get('completion_tokens', '?')}"
-                        )
-
-                    content = data["choices"][0]["message"]["content"]
-                    return json.loads(content)
+
+                r.raise_for_status()
+                data = orjson.loads(r.content)
+
+                usage = data.get("usage", {})
+                if usage:
+                    print(
+                        f"[AI Report] {section_name} tokens — "
+                        f"prompt: {usage.get('prompt_tokens', '?')}, "
+                        f"completion: {usage.get('completion_tokens', '?')}"
+                    )
+
+                content = data["choices"][0]["message"]["content"]
+                return orjson.loads(content)
 
             except json.JSONDecodeError as e:
                 print(f"[AI Report] {section_name} JSON parse error: {e}")
@@ -5,22 +5,73 @@ Uses OpenWeather Air Pollution API for real-time data
 """
 
 import httpx
+import orjson
 import random
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+from cachetools import TTLCache
 from app.schemas.air_quality import AirQualityData, AirQualityResponse
 from app.config import get_settings
+from app.services.http_client import http_client
 
 settings = get_settings()
 
+# EPA PM2.5 Breakpoints (ug/m3): (BpLo, BpHi, IqLo, IqHi)
+PM25_AQI_BREAKPOINTS = (
+    (0.0, 12.0, 0, 50),
+    (12.1, 35.4, 51, 100),
+    (35.5, 55.4, 101, 150),
+    (55.5, 150.4, 151, 200),
+    (150.5, 250.4, 201, 300),
+    (250.5, 350.4, 301, 400),
+    (350.5, 500.4, 401, 500),
+)
+
+# EPA PM10 Breakpoints (ug/m3)
+PM10_AQI_BREAKPOINTS = (
+    (0, 54, 0, 50),
+    (55, 154, 51, 100),
+    (155, 254, 101, 150),
+    (255, 354, 151, 200),
+    (355, 424, 201, 300),
+    (425, 504, 301, 400),
+    (505, 604, 401, 500),
+)
+
+# (name, AirQualityData field, AQI breakpoint used to normalize the concentration)
+POLLUTANT_BREAKPOINTS = (
+    ("PM2.5", "pm25", 35.4),
+    ("PM10", "pm10", 154),
+    ("CO", "co", 9.4),
+    ("NO2", "no2", 100),
+    ("SO2", "so2", 75),
+    ("O3", "o3", 70),
+)
+
+# Mock geocoding table: (lat_lo, lat_hi, lon_lo, lon_hi, name), first match wins
+CITY_BOUNDS = (
+    (40, 41, -75, -73, "New York, NY"),
+    (34, 35, -119, -117, "Los Angeles, CA"),
+    (37, 38, -123, -122, "San Francisco, CA"),
+)
+
+HEALTH_INTERPRETATIONS = {
+    "low": "Good air quality. Air pollution poses little or no risk. Ideal for outdoor activities.",
+    "medium": "Moderate air quality. Acceptable for most people, but sensitive individuals should consider limiting prolonged outdoor exertion.",
+    "high": "Unhealthy air quality. Everyone may begin to experience health effects. Sensitive groups should avoid outdoor activities."
+}
+
 
 class AirQualityService:
     """Service for fetching and analyzing air quality data from OpenWeather API"""
     
     BASE_URL = "https://api.openweathermap.org/data/2.5"
+    CACHE_TTL = 1800  # seconds; OpenWeather refreshes air pollution data hourly
     
     def __init__(self):
         """Initialize service with OpenWeather API key"""
         self.api_key = settings.OPENWEATHER_API_KEY
+        # Real readings keyed on coordinates rounded to ~1 km
+        self._cache = TTLCache(maxsize=4096, ttl=self.CACHE_TTL)
     
     async def get_air_quality(self, latitude: float, longitude: float) -> AirQualityResponse:
         """
@@ -31,10 +82,14 @@ class AirQualityService:
         air_data = None
 
         if self.api_key:
-            try:
-                air_data = await self._fetch_real_air_quality(latitude, longitude)
-            except Exception as e:
-                print(f"Air Quality API failed ({e}). Falling back to mock.")
+            cache_key = (round(latitude, 2), round(longitude, 2))
+            air_data = self._cache.get(cache_key)
+            if air_data is None:
+                try:
+                    air_data = await self._fetch_real_air_quality(*cache_key)
+                    self._cache[cache_key] = air_data
+                except Exception as e:
+                    print(f"Air Quality API failed ({e}). Falling back to mock.")
                 
         if not air_data:
             air_data = self._generate_mock_air_quality(latitude, longitude)
@@ -73,10 +128,9 @@ class AirQualityService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, timeout=10.0)
-                response.raise_for_status()
-                data = response.json()
+            response = await http_client.client.get(url, params=params, timeout=10.0)
+            response.raise_for_status()
+            data = orjson.loads(response.content)
             
             # OpenWeather Air Pollution API response structure
             components = data["list"][0]["components"]
@@ -90,6 +144,7 @@ class AirQualityService:
             # Calculate precise US EPA AQI from pollutant concentrations
             aqi = self._calculate_precise_aqi(pm25_val, pm10_val)
             
+            # Parsed from an external response, so always validated
             return AirQualityData(
                 aqi=aqi,
                 pm25=pm25_val,
@@ -102,26 +157,26 @@ class AirQualityService:
             
         except httpx.HTTPError as e:
             raise ValueError(f"OpenWeather API error: {e}")
-        except (KeyError, IndexError) as e:
+        except (KeyError, IndexError, orjson.JSONDecodeError) as e:
             raise ValueError(f"Unexpected OpenWeather API response format: {e}")
     
     def _generate_mock_air_quality(self, lat: float, lon: float) -> AirQualityData:
         """Generate realistic mock air quality data"""
-        # Use location to seed variation
-        seed = int((abs(lat) + abs(lon)) * 100)
-        random.seed(seed)
+        # Use location to seed variation (local RNG, same stream as seeding the global one)
+        rng = random.Random(int((abs(lat) + abs(lon)) * 100))
+        uniform = rng.uniform
         
         # Generate correlated pollutant levels
-        base_pollution = random.uniform(20, 120)
+        base_pollution = uniform(20, 120)
         
         return AirQualityData(
-            aqi=int(base_pollution + random.uniform(-10, 30)),
-            pm25=round(base_pollution * 0.3 + random.uniform(-5, 10), 1),
-            pm10=round(base_pollution * 0.5 + random.uniform(-5, 15), 1),
-            co=round(random.uniform(0.2, 1.5), 2),
-            no2=round(base_pollution * 0.4 + random.uniform(-10, 15), 1),
-            so2=round(random.uniform(5, 30), 1),
-            o3=round(random.uniform(30, 80), 1)
+            aqi=int(base_pollution + uniform(-10, 30)),
+            pm25=round(base_pollution * 0.3 + uniform(-5, 10), 1),
+            pm10=round(base_pollution * 0.5 + uniform(-5, 15), 1),
+            co=round(uniform(0.2, 1.5), 2),
+            no2=round(base_pollution * 0.4 + uniform(-10, 15), 1),
+            so2=round(uniform(5, 30), 1),
+            o3=round(uniform(30, 80), 1)
         )
     
     def _calculate_air_risk_level(self, data: AirQualityData) -> str:
@@ -135,17 +190,14 @@ class AirQualityService:
     
     def _get_primary_pollutant(self, data: AirQualityData) -> str:
         """Identify primary pollutant"""
-        pollutants = {
-            "PM2.5": data.pm25 / 35.4,  # Normalize to AQI breakpoint
-            "PM10": data.pm10 / 154,
-            "CO": data.co / 9.4,
-            "NO2": data.no2 / 100,
-            "SO2": data.so2 / 75,
-            "O3": data.o3 / 70
-        }
-        return max(pollutants, key=pollutants.get)
+        primary, highest = None, float("-inf")
+        for name, field, breakpoint in POLLUTANT_BREAKPOINTS:
+            ratio = getattr(data, field) / breakpoint
+            if ratio > highest:
+                primary, highest = name, ratio
+        return primary
 
-    def _calc_aqi_subindex(self, Cp: float, breakpoints: list) -> int:
+    def _calc_aqi_subindex(self, Cp: float, breakpoints: tuple) -> int:
         """Helper to calculate piece-wise linear AQI subindex for a pollutant"""
         for (BpLo, BpHi, IqLo, IqHi) in breakpoints:
             if BpLo <= Cp <= BpHi:
@@ -157,56 +209,29 @@ class AirQualityService:
 
     def _calculate_precise_aqi(self, pm25: float, pm10: float) -> int:
         """Calculate US EPA AQI precisely using PM2.5 and PM10"""
-        # EPA PM2.5 Breakpoints (ug/m3)
-        pm25_breakpoints = [
-            (0.0, 12.0, 0, 50),
-            (12.1, 35.4, 51, 100),
-            (35.5, 55.4, 101, 150),
-            (55.5, 150.4, 151, 200),
-            (150.5, 250.4, 201, 300),
-            (250.5, 350.4, 301, 400),
-            (350.5, 500.4, 401, 500),
-        ]
-        
-        # EPA PM10 Breakpoints (ug/m3)
-        pm10_breakpoints = [
-            (0, 54, 0, 50),
-            (55, 154, 51, 100),
-            (155, 254, 101, 150),
-            (255, 354, 151, 200),
-            (355, 424, 201, 300),
-            (425, 504, 301, 400),
-            (505, 604, 401, 500),
-        ]
-        
-        aqi_pm25 = self._calc_aqi_subindex(pm25, pm25_breakpoints)
-        aqi_pm10 = self._calc_aqi_subindex(pm10, pm10_breakpoints)
+        aqi_pm25 = self._calc_aqi_subindex(pm25, PM25_AQI_BREAKPOINTS)
+        aqi_pm10 = self._calc_aqi_subindex(pm10, PM10_AQI_BREAKPOINTS)
         
         return max(aqi_pm25, aqi_pm10)
     
     def _generate_health_interpretation(self, aqi: int, risk_level: str) -> str:
         """Generate human-readable health interpretation"""
-        interpretations = {
-            "low": "Good air quality. Air pollution poses little or no risk. Ideal for outdoor activities.",
-            "medium": "Moderate air quality. Acceptable for most people, but sensitive individuals should consider limiting prolonged outdoor exertion.",
-            "high": "Unhealthy air quality. Everyone may begin to experience health effects. Sensitive groups should avoid outdoor activities."
-        }
-        return interpretations.get(risk_level, "Unknown air quality")
+        return HEALTH_INTERPRETATIONS.get(risk_level, "Unknown air quality")
     
     def _get_location_name(self, lat: float, lon: float) -> str:
         """
         Get location name from coordinates
         Mock implementation - use geocoding API in production
         """
+        return self._get_city_name(lat, lon) or f"Location ({lat:.2f}, {lon:.2f})"
+
+    def _get_city_name(self, lat: float, lon: float) -> Optional[str]:
+        """Known city for the coordinates, or None outside the mock city bounds"""
         # Simple mock based on major cities
-        if 40 <= lat <= 41 and -75 <= lon <= -73:
-            return "New York, NY"
-        elif 34 <= lat <= 35 and -119 <= lon <= -117:
-            return "Los Angeles, CA"
-        elif 37 <= lat <= 38 and -123 <= lon <= -122:
-            return "San Francisco, CA"
-        else:
-            return f"Location ({lat:.2f}, {lon:.2f})"
+        for lat_lo, lat_hi, lon_lo, lon_hi, name in CITY_BOUNDS:
+            if lat_lo <= lat <= lat_hi and lon_lo <= lon <= lon_hi:
+                return name
+        return None
 
 
 # Singleton instance
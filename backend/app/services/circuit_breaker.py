@@ -0,0 +1,63 @@
+"""
+Circuit Breaker
+Stops calling a failing upstream for a cool-down period so requests fall back immediately
+"""
+
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Opens after N consecutive failures; lets a single trial call through after reset_timeout"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failure_count = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+
+    def allow_request(self) -> bool:
+        """
+        True if the caller may call the upstream; it must then report the outcome
+        with record_success() or record_failure()
+        """
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        elif now - self.probe_started_at < self.reset_timeout:
+            # Half-open with a trial call in flight: everyone else keeps falling back
+            return False
+        # Start the trial call (or replace one that never reported back, e.g. cancelled)
+        self.probe_started_at = now
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failure_count = 0
+        self.opened_at = None
+        self.probe_started_at = None
+
+    def record_failure(self) -> None:
+        self.failure_count += 1
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self.failure_count >= self.failure_threshold
+        ):
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.probe_started_at = None
+            logger.warning("%s circuit opened after %d failures; skipping for %ss",
+                           self.name, self.failure_count, self.reset_timeout)
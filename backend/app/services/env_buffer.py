@@ -0,0 +1,79 @@
+"""
+Environmental Data Buffer
+Queues EnvironmentalData rows and writes them to the database in batches
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from app.database import SessionLocal
+from app.models.environmental_data import EnvironmentalData
+
+logger = logging.getLogger(__name__)
+
+
+class EnvironmentalDataBuffer:
+    """Collects rows collected for future ML and inserts them with one commit per batch"""
+
+    BATCH_SIZE = 100
+    FLUSH_INTERVAL = 5.0  # seconds
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._batch_ready = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def enqueue(self, row: Dict[str, Any]) -> None:
+        """Queue a row of EnvironmentalData column values for the next batch"""
+        await self._queue.put(row)
+        if self._queue.qsize() >= self.BATCH_SIZE:
+            self._batch_ready.set()
+
+    def start(self) -> None:
+        """Start the periodic flush loop (called from the app lifespan)"""
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write whatever is still queued"""
+        if self._task is not None:
+            # Ask the loop to exit instead of cancelling it, so a batch it has
+            # already taken off the queue is inserted rather than lost mid-flush
+            self._stopping.set()
+            self._batch_ready.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Drain the queue and insert its rows in batches; returns the number written"""
+        written = 0
+        while not self._queue.empty():
+            rows: List[Dict[str, Any]] = []
+            while len(rows) < self.BATCH_SIZE and not self._queue.empty():
+                rows.append(self._queue.get_nowait())
+
+            try:
+                async with SessionLocal() as db:
+                    await db.execute(insert(EnvironmentalData), rows)
+                    await db.commit()
+                written += len(rows)
+            except Exception:
+                logger.exception("Environmental data batch insert failed (%d rows dropped)", len(rows))
+        return written
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self.flush()
+
+
+# Singleton instance
+env_buffer = EnvironmentalDataBuffer()
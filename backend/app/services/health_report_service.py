@@ -4,15 +4,21 @@ Combines environmental and lifestyle data to generate comprehensive health repor
 """
 
 import asyncio
+import hashlib
+import logging
+import re
+from itertools import islice
+from types import MappingProxyType
 from typing import List, Dict, Optional, Any
 from datetime import datetime
+from cachetools import TTLCache
 from app.schemas.health_report import (
     ContributingFactor,
     HealthRecommendation,
     HealthReportResponse
 )
-from app.schemas.air_quality import AirQualityResponse
-from app.schemas.soil import SoilDataResponse
+from app.schemas.air_quality import AirQualityResponse, AirQualityData
+from app.schemas.soil import SoilDataResponse, SoilProperties
 from app.schemas.water import WaterDataResponse
 from app.schemas.lifestyle import LifestyleInput
 from app.services.air_quality_service import air_quality_service
@@ -20,11 +26,77 @@ from app.services.perplexity_soil_service import perplexity_soil_service as soil
 from app.services.water_service import water_service
 from app.services.lifestyle_service import lifestyle_service
 from app.services.ai_health_report_service import ai_health_report_service
+from app.services.circuit_breaker import CircuitBreaker
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Factors and recommendations are assembled here from plain str values, so they
+# skip re-validation in every environment
+_factor = ContributingFactor.model_construct
+_recommendation = HealthRecommendation.model_construct
 
 
 class HealthReportService:
     """Service for generating comprehensive health risk reports"""
 
+    # Lookup tables used on every report
+    AGE_MULTIPLIERS = {
+        "0-1": 2.5, "1-3": 2.2, "3-12": 1.8, "13-17": 1.3,
+        "18-25": 1.0, "26-35": 1.0, "36-50": 1.1, "51-65": 1.3, "65+": 1.5
+    }
+    CHILD_AGE_RANGES = frozenset(("0-1", "1-3", "3-12"))
+    RESPIRATORY_RE = re.compile(r"asthma|copd|bronchitis|lung")
+    CARDIO_RE = re.compile(r"heart|cardio")
+    SOIL_RISK_SCORES = {"low": 10, "medium": 40, "high": 80}
+    WATER_RISK_SCORES = {"low": 10, "medium": 45, "high": 85}
+    RISK_LEVEL_CODES = {"low": 1, "medium": 2, "high": 3}
+    # Fixed feature order so stored vectors stack into rows: [fv[n] for n in FEATURE_NAMES]
+    # (the report's own summary vector; the ML model's input is ml.MODEL_FEATURE_NAMES)
+    FEATURE_NAMES = ("aqi", "soil_ph", "water_ph", "water_risk", "smoking")
+    SEVERITIES = frozenset(("low", "medium", "high"))
+    ELEVATED_RISKS = frozenset(("medium", "high"))
+    # Read-only fallbacks shared by every request that can't reach soil/water upstreams.
+    # They only reach responses through the validating soil/water models, which copy
+    # the tuples into fresh lists; never pass them to model_construct
+    SOIL_FALLBACK = MappingProxyType({
+        "location": "Unknown",
+        "soil_type": "Unknown",
+        "ph": 7.0,
+        "contamination_risk": "low",
+        "health_implications": ("Data unavailable",),
+        "confidence": "low",
+        "data_source": "mock_fallback"
+    })
+    WATER_FALLBACK = MappingProxyType({
+        "location": "Unknown",
+        "source_type": "Unknown",
+        "ph": 7.0,
+        "hardness": "moderate",
+        "lead_risk": "low",
+        "contamination_risk": "low",
+        "health_implications": ("Data unavailable",),
+        "recommendations": ("Use standard water filters",),
+        "confidence": "low",
+        "data_source": "mock_fallback"
+    })
+    NOISE_PLACEHOLDER = {"level": 55, "risk_score": 10, "source": "Traffic (Est.)"}
+    RADIATION_PLACEHOLDER = {"level": "Low", "risk_score": 5, "source": "Background"}
+    SUMMARY_OPENINGS = {
+        "low":    "Your overall health risk is low. ",
+        "medium": "Your health risk is moderate. ",
+        "high":   "Your health risk is elevated. ",
+    }
+    REPORT_CACHE_TTL = 3600  # seconds
+
+    def __init__(self):
+        # Finished reports keyed on (~100 m cell, lifestyle answers); read-only once stored
+        self._report_cache = TTLCache(maxsize=10_000, ttl=self.REPORT_CACHE_TTL)
+        # During an upstream outage, fall back immediately instead of waiting out the timeout
+        self._soil_breaker = CircuitBreaker("Soil Service")
+        self._water_breaker = CircuitBreaker("Water Service")
+
     async def generate_report(
         self,
         latitude: float,
@@ -33,15 +105,52 @@ class HealthReportService:
     ) -> Dict:
         """
         Generate comprehensive health report combining all data sources
-        """
 
-       
-        try:
-            air_quality = await air_quality_service.get_air_quality(latitude, longitude)
-        except Exception as e:
-            print(f"Air Quality Service Failed: {e}")
-            from app.schemas.air_quality import AirQualityResponse, AirQualityData
-            air_quality = AirQualityResponse(
+        Reports are cached per location and lifestyle input; reports whose AI
+        sections fell back to static content are not cached so they get retried.
+        """
+        cache_key = self._report_cache_key(latitude, longitude, lifestyle_data)
+        report = self._report_cache.get(cache_key)
+        if report is None:
+            report = await self._build_report(latitude, longitude, lifestyle_data)
+            if report.get("ai_meta", {}).get("model") != "static_fallback":
+                self._report_cache[cache_key] = report
+        return report
+
+    @staticmethod
+    def _report_cache_key(latitude: float, longitude: float, lifestyle_data: Optional[LifestyleInput]) -> str:
+        lifestyle_json = lifestyle_data.model_dump_json() if lifestyle_data else ""
+        raw = f"{round(latitude, 3)}|{round(longitude, 3)}|{lifestyle_json}"
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    async def _build_report(
+        self,
+        latitude: float,
+        longitude: float,
+        lifestyle_data: Optional[LifestyleInput] = None
+    ) -> Dict:
+        """Fetch all data sources and assemble a fresh report"""
+
+        # ── 1-2. Air, Soil & Water (parallel) ─────────────────────
+        # The location name is derived from the coordinates alone, so the
+        # soil/water lookups don't need to wait for the air quality result
+        location_name = air_quality_service._get_location_name(latitude, longitude)
+        # Only a real city name goes into the soil/water lookups; the coordinate
+        # fallback would make every request its own cache key
+        city_name = air_quality_service._get_city_name(latitude, longitude)
+        city = city_name.split(',')[0] if city_name else None
+
+        async def safe_air_quality():
+            try:
+                return await asyncio.wait_for(
+                    air_quality_service.get_air_quality(latitude, longitude),
+                    timeout=settings.AIR_QUALITY_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                logger.warning("Air Quality Service timed out after %ss", settings.AIR_QUALITY_TIMEOUT)
+            except Exception as e:
+                logger.warning("Air Quality Service Failed: %s", e)
+            return AirQualityResponse(
                 latitude=latitude,
                 longitude=longitude,
                 location_name="Unknown Location",
@@ -61,55 +170,56 @@ class HealthReportService:
                 data_source="mock_fallback"
             )
 
-        # ── 2. Soil & Water (parallel) ─────────────────────────────
+        # Air, soil and water results are cached in their own services
         async def safe_soil_research():
-            try:
-                return await soil_service.research_soil_data(
-                    latitude, longitude,
-                    city=air_quality.location_name.split(',')[0] if air_quality.location_name else None
-                )
-            except Exception as e:
-                print(f"Soil Service Failed: {e}")
-                return {
-                    "location": "Unknown",
-                    "soil_type": "Unknown",
-                    "ph": 7.0,
-                    "contamination_risk": "low",
-                    "health_implications": ["Data unavailable"],
-                    "confidence": "low",
-                    "data_source": "mock_fallback"
-                }
+            if not soil_service.api_key:
+                # Soil research needs a key; skip the call rather than count a breaker failure
+                return self.SOIL_FALLBACK
+            if not self._soil_breaker.allow_request():
+                logger.warning("Soil Service circuit open, using fallback")
+            else:
+                try:
+                    result = await asyncio.wait_for(
+                        soil_service.research_soil_data(latitude, longitude, city=city, fallback=False),
+                        timeout=settings.SOIL_TIMEOUT
+                    )
+                    self._soil_breaker.record_success()
+                    return result
+                except asyncio.TimeoutError:
+                    logger.warning("Soil Service timed out after %ss", settings.SOIL_TIMEOUT)
+                    self._soil_breaker.record_failure()
+                except Exception as e:
+                    logger.warning("Soil Service Failed: %s", e)
+                    self._soil_breaker.record_failure()
+            return self.SOIL_FALLBACK
 
         async def safe_water_quality():
-            try:
-                return await water_service.get_water_quality(
-                    latitude, longitude,
-                    city=air_quality.location_name.split(',')[0] if air_quality.location_name else None
-                )
-            except Exception as e:
-                print(f"Water Service Failed: {e}")
-                return {
-                    "location": "Unknown",
-                    "coordinates": {"latitude": latitude, "longitude": longitude},
-                    "source_type": "Unknown",
-                    "ph": 7.0,
-                    "hardness": "moderate",
-                    "lead_risk": "low",
-                    "contamination_risk": "low",
-                    "health_implications": ["Data unavailable"],
-                    "recommendations": ["Use standard water filters"],
-                    "confidence": "low",
-                    "data_source": "mock_fallback"
-                }
-
-        soil_data_dict, water_data = await asyncio.gather(
-            safe_soil_research(), safe_water_quality()
+            if not self._water_breaker.allow_request():
+                logger.warning("Water Service circuit open, using fallback")
+            else:
+                try:
+                    result = await asyncio.wait_for(
+                        water_service.get_water_quality(latitude, longitude, city=city, fallback=False),
+                        timeout=settings.WATER_TIMEOUT
+                    )
+                    self._water_breaker.record_success()
+                    return result
+                except asyncio.TimeoutError:
+                    logger.warning("Water Service timed out after %ss", settings.WATER_TIMEOUT)
+                    self._water_breaker.record_failure()
+                except Exception as e:
+                    logger.warning("Water Service Failed: %s", e)
+                    self._water_breaker.record_failure()
+            return {**self.WATER_FALLBACK, "coordinates": {"latitude": latitude, "longitude": longitude}}
+
+        air_quality, soil_data_dict, water_data = await asyncio.gather(
+            safe_air_quality(), safe_soil_research(), safe_water_quality()
         )
 
         # ── 3. Convert dicts → Pydantic models ────────────────────
+        # Always validated: soil/water risk labels are AI-sourced and RiskLevel lowercases them
         water_response = WaterDataResponse(**water_data)
 
-        from app.schemas.soil import SoilProperties
         soil_response = SoilDataResponse(
             latitude=latitude,
             longitude=longitude,
@@ -127,8 +237,9 @@ class HealthReportService:
         )
 
         # ── 4. Placeholder ambient data ────────────────────────────
-        noise_data     = {"level": 55, "risk_score": 10, "source": "Traffic (Est.)"}
-        radiation_data = {"level": "Low", "risk_score": 5, "source": "Background"}
+        # Static until real noise/radiation sources exist; those should join the gather above
+        noise_data     = self.NOISE_PLACEHOLDER
+        radiation_data = self.RADIATION_PLACEHOLDER
 
         # ── 5. Risk score calculations ─────────────────────────────
         env_risk_base = self._calculate_environmental_risk(air_quality, soil_response, water_response)
@@ -183,7 +294,7 @@ class HealthReportService:
                 radiation_data           = radiation_data,
             )
         except Exception as e:
-            print(f"[Health Report] AI generation failed — falling back to static sections: {e}")
+            logger.warning("AI generation failed — falling back to static sections: %s", e)
             # Graceful fallback: generate static sections so the report still works
             static = self._generate_detailed_sections(
                 lifestyle_data, air_quality, None,
@@ -233,8 +344,8 @@ class HealthReportService:
 
             # ── Summary & factors ─────────────────────────────────
             "report_summary":         report_summary,
-            "contributing_factors":   [f.model_dump() for f in contributing_factors],
-            "health_recommendations": [r.model_dump() for r in recommendations],
+            "contributing_factors":   contributing_factors,
+            "health_recommendations": recommendations,
 
             # ── Ambient ──────────────────────────────────────────
             "noise_data":     noise_data,
@@ -256,25 +367,21 @@ class HealthReportService:
     # ══════════════════════════════════════════════════════════════
 
     def _calculate_vulnerability_multiplier(self, data: LifestyleInput, aqi: float = 50) -> float:
-        age_value = data.age_range.value if hasattr(data.age_range, 'value') else data.age_range
-        age_multipliers = {
-            "0-1": 2.5, "1-3": 2.2, "3-12": 1.8, "13-17": 1.3,
-            "18-25": 1.0, "26-35": 1.0, "36-50": 1.1, "51-65": 1.3, "65+": 1.5
-        }
-        multiplier = age_multipliers.get(age_value, 1.0)
+        # str-based enums hash and compare like their values, so look them up directly
+        multiplier = self.AGE_MULTIPLIERS.get(data.age_range, 1.0)
 
         if data.medical_history:
-            for condition in data.medical_history:
-                cl = condition.lower()
-                if any(x in cl for x in ["asthma", "copd", "bronchitis", "lung"]):
+            pregnant = False
+            for cl in data.conditions_lower:
+                pregnant = pregnant or "pregnan" in cl
+                if self.RESPIRATORY_RE.search(cl):
                     multiplier += 0.4
-                elif "heart" in cl or "cardio" in cl:
+                elif self.CARDIO_RE.search(cl):
                     multiplier += 0.3
                 elif "allergy" in cl:
                     multiplier += 0.1
 
-        if data.gender and data.gender.lower() == "female" and data.medical_history:
-            if any("pregnan" in c.lower() for c in data.medical_history):
+            if pregnant and data.gender and data.gender.lower() == "female":
                 multiplier += 0.4
 
         if data.mental_health_conditions:
@@ -311,12 +418,9 @@ class HealthReportService:
         water_data: WaterDataResponse
     ) -> float:
         air_risk  = min((air_quality.data.aqi / 500) * 100, 100)
-        soil_risk = {"low": 10, "medium": 40, "high": 80}.get(
-            (soil_data.properties.contamination_risk or "low").lower(), 20
-        )
-        water_risk = {"low": 10, "medium": 45, "high": 85}.get(
-            (water_data.contamination_risk or "low").lower(), 20
-        )
+        # contamination_risk is lowercased by the schemas (RiskLevel)
+        soil_risk = self.SOIL_RISK_SCORES.get(soil_data.properties.contamination_risk, 20)
+        water_risk = self.WATER_RISK_SCORES.get(water_data.contamination_risk or "low", 20)
         return (air_risk * 0.5) + (soil_risk * 0.25) + (water_risk * 0.25)
 
     def _get_risk_level(self, risk_score: float) -> str:
@@ -338,56 +442,58 @@ class HealthReportService:
         factors = []
 
         if lifestyle_data and air_quality.data.aqi > 100:
-            smoking_val = lifestyle_data.smoking_status.value if hasattr(lifestyle_data.smoking_status, 'value') else str(lifestyle_data.smoking_status)
-            if smoking_val == "current":
-                factors.append(ContributingFactor(
+            if lifestyle_data.smoking_status == "current":
+                factors.append(_factor(
                     category="interaction",
                     factor="CRITICAL INTERACTION: Smoking + High Air Pollution dramatically increases cardiovascular risk.",
                     impact="negative", severity="high"
                 ))
-            if lifestyle_data.medical_history and any("asthma" in c.lower() for c in lifestyle_data.medical_history):
-                factors.append(ContributingFactor(
+            if any("asthma" in c for c in lifestyle_data.conditions_lower):
+                factors.append(_factor(
                     category="interaction",
                     factor="CRITICAL INTERACTION: Asthma + High Air Pollution",
                     impact="negative", severity="high"
                 ))
 
         if air_quality.data.aqi > 100:
-            factors.append(ContributingFactor(
+            factors.append(_factor(
                 category="environmental",
                 factor=f"High AQI ({air_quality.data.aqi}) - Primary pollutant: {air_quality.primary_pollutant}",
                 impact="negative", severity="high"
             ))
         elif air_quality.data.aqi > 50:
-            factors.append(ContributingFactor(
+            factors.append(_factor(
                 category="environmental",
                 factor=f"Moderate AQI ({air_quality.data.aqi})",
                 impact="negative", severity="medium"
             ))
 
-        if water_data.contamination_risk and water_data.contamination_risk.lower() != "low":
-            rv = water_data.contamination_risk.lower()
-            factors.append(ContributingFactor(
+        rv = water_data.contamination_risk
+        if rv and rv != "low":
+            factors.append(_factor(
                 category="environmental",
-                factor=f"{water_data.contamination_risk.capitalize()} water contamination risk",
+                factor=f"{rv.capitalize()} water contamination risk",
                 impact="negative",
-                severity=rv if rv in ["low", "medium", "high"] else "medium"
+                severity=rv if rv in self.SEVERITIES else "medium"
             ))
 
-        soil_rv = (soil_data.properties.contamination_risk or "low").lower()
+        soil_rv = soil_data.properties.contamination_risk or "low"
         if soil_rv != "low":
-            factors.append(ContributingFactor(
+            factors.append(_factor(
                 category="environmental",
-                factor=f"{soil_data.properties.contamination_risk.capitalize()} soil contamination risk",
+                factor=f"{soil_rv.capitalize()} soil contamination risk",
                 impact="negative",
-                severity=soil_rv if soil_rv in ["low", "medium", "high"] else "medium"
+                severity=soil_rv if soil_rv in self.SEVERITIES else "medium"
             ))
 
-        for rf in lifestyle_risk_factors[:3]:
-            factors.append(ContributingFactor(category="lifestyle", factor=rf, impact="negative", severity="medium"))
-
-        for pf in lifestyle_positive_factors[:3]:
-            factors.append(ContributingFactor(category="lifestyle", factor=pf, impact="positive", severity="medium"))
+        factors.extend(
+            _factor(category="lifestyle", factor=rf, impact="negative", severity="medium")
+            for rf in islice(lifestyle_risk_factors, 3)
+        )
+        factors.extend(
+            _factor(category="lifestyle", factor=pf, impact="positive", severity="medium")
+            for pf in islice(lifestyle_positive_factors, 3)
+        )
 
         return factors
 
@@ -402,30 +508,30 @@ class HealthReportService:
         recommendations = []
 
         if air_quality.data.aqi > 100:
-            recommendations.append(HealthRecommendation(
+            recommendations.append(_recommendation(
                 category="environmental",
                 title="Monitor Air Quality Daily",
                 description="Check AQI before outdoor activities. Limit exertion when AQI exceeds 100.",
                 priority="high"
             ))
 
-        if water_data.contamination_risk in ["medium", "high"]:
-            recommendations.append(HealthRecommendation(
+        if water_data.contamination_risk in self.ELEVATED_RISKS:
+            recommendations.append(_recommendation(
                 category="environmental",
                 title="Water Safety",
                 description="Consider using a certified water filter or drinking bottled water.",
                 priority="high" if water_data.contamination_risk == "high" else "medium"
             ))
         elif water_data.hardness == "hard":
-            recommendations.append(HealthRecommendation(
+            recommendations.append(_recommendation(
                 category="environmental",
                 title="Hard Water Care",
                 description="Your water is hard. Use moisturizers to prevent skin dryness.",
                 priority="low"
             ))
 
-        if soil_data.properties.contamination_risk in ["medium", "high"]:
-            recommendations.append(HealthRecommendation(
+        if soil_data.properties.contamination_risk in self.ELEVATED_RISKS:
+            recommendations.append(_recommendation(
                 category="environmental",
                 title="Soil Safety Precautions",
                 description="Wash hands thoroughly after gardening or outdoor activities.",
@@ -433,13 +539,15 @@ class HealthReportService:
             ))
 
         if lifestyle_data:
-            for rec in lifestyle_service.generate_lifestyle_recommendations(lifestyle_data, [])[:2]:
-                recommendations.append(HealthRecommendation(
+            recommendations.extend(
+                _recommendation(
                     category="lifestyle",
                     title="Lifestyle Improvement",
                     description=rec,
                     priority="medium"
-                ))
+                )
+                for rec in islice(lifestyle_service.generate_lifestyle_recommendations(lifestyle_data, []), 2)
+            )
 
         return recommendations
 
@@ -451,11 +559,7 @@ class HealthReportService:
         lifestyle_risk: float,
         lifestyle_data: Optional[LifestyleInput] = None
     ) -> str:
-        summary = {
-            "low":    "Your overall health risk is low. ",
-            "medium": "Your health risk is moderate. ",
-            "high":   "Your health risk is elevated. ",
-        }.get(risk_level, "")
+        summary = self.SUMMARY_OPENINGS.get(risk_level, "")
 
         if env_risk > lifestyle_risk * 1.5:
             summary += "Environmental factors (Air/Water/Soil) are the primary concern. "
@@ -465,8 +569,7 @@ class HealthReportService:
             summary += "Both environmental and lifestyle factors contribute to your risk. "
 
         if lifestyle_data:
-            age_value = lifestyle_data.age_range.value if hasattr(lifestyle_data.age_range, 'value') else str(lifestyle_data.age_range)
-            if age_value in ["0-1", "1-3", "3-12"]:
+            if lifestyle_data.age_range in self.CHILD_AGE_RANGES:
                 summary += "Children under 12 are 2–3x more sensitive to environmental pollutants as their organs are still developing. Extra precaution is strongly advised."
 
         return summary
@@ -478,16 +581,17 @@ class HealthReportService:
         water_data: WaterDataResponse,
         lifestyle_data: Optional[LifestyleInput]
     ) -> Dict[str, float]:
-        features = {
-            "aqi":        float(air_quality.data.aqi),
-            "soil_ph":    soil_data.properties.ph,
-            "water_ph":   water_data.ph,
-            "water_risk": {"low": 1, "medium": 2, "high": 3}.get(water_data.contamination_risk, 1),
-        }
-        if lifestyle_data:
-            smoking_val = lifestyle_data.smoking_status.value if hasattr(lifestyle_data.smoking_status, 'value') else str(lifestyle_data.smoking_status)
-            features["smoking"] = 1 if smoking_val != "never" else 0
-        return features
+        smoking = 0.0
+        if lifestyle_data and lifestyle_data.smoking_status != "never":
+            smoking = 1.0
+        values = (
+            float(air_quality.data.aqi),
+            float(soil_data.properties.ph),
+            float(water_data.ph if water_data.ph is not None else 7.0),
+            float(self.RISK_LEVEL_CODES.get(water_data.contamination_risk, 1)),
+            smoking,
+        )
+        return dict(zip(self.FEATURE_NAMES, values))
 
     def _generate_detailed_sections(
         self,
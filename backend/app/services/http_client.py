@@ -0,0 +1,70 @@
+"""
+Shared HTTP Client
+One pooled httpx.AsyncClient reused by services and routers for outbound calls
+"""
+
+import asyncio
+import logging
+from typing import Optional
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class SharedHTTPClient:
+    """Lazily creates a keep-alive, HTTP/2 capable client and closes it on shutdown"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the pooled client, creating it on first use (or after a close)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=20),
+                timeout=30.0,
+                follow_redirects=True
+            )
+        return self._client
+
+    # Failures worth retrying quickly. Idempotent requests retry any network error
+    # or gateway hiccup. Other methods (paid POSTs) retry only when the request
+    # cannot have reached the upstream, or when the upstream refused it (503).
+    # Read timeouts are never retried.
+    IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+    RETRY_EXCEPTIONS = (httpx.NetworkError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    RETRY_STATUSES = frozenset((502, 503, 504))
+    UNSENT_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    UNPROCESSED_STATUSES = frozenset((503,))
+
+    async def request(
+        self, method: str, url: str, *, attempts: int = 3, backoff: float = 0.2, **kwargs
+    ) -> httpx.Response:
+        """Send a request on the pooled client, retrying transient failures with exponential backoff"""
+        if method.upper() in self.IDEMPOTENT_METHODS:
+            retry_exceptions, retry_statuses = self.RETRY_EXCEPTIONS, self.RETRY_STATUSES
+        else:
+            retry_exceptions, retry_statuses = self.UNSENT_EXCEPTIONS, self.UNPROCESSED_STATUSES
+        for attempt in range(1, attempts + 1):
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                if response.status_code not in retry_statuses or attempt == attempts:
+                    return response
+                logger.warning("%s %s -> HTTP %s, retrying (attempt %d)", method, url, response.status_code, attempt)
+            except retry_exceptions as e:
+                if attempt == attempts:
+                    raise
+                logger.warning("%s %s failed (%r), retrying (attempt %d)", method, url, e, attempt)
+            await asyncio.sleep(min(backoff * 2 ** (attempt - 1), 2.0))
+
+    async def aclose(self) -> None:
+        """Close pooled connections (called from the app lifespan)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Singleton instance
+http_client = SharedHTTPClient()
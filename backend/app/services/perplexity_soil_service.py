@@ -3,22 +3,69 @@ Perplexity Soil Research Service
 Uses OpenAI to research soil properties and health impacts for a location
 """
 
-import httpx
-import json
+import logging
 import re
+import orjson
 from typing import Dict, List, Optional
+from cachetools import TTLCache
 from app.config import get_settings
+from app.services.http_client import http_client
+from app.services.single_flight import SingleFlight
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 class PerplexitySoilService:
     """Service for researching soil data using OpenAI"""
     
     BASE_URL = "https://api.openai.com/v1/chat/completions"
+    CACHE_TTL = 7 * 24 * 3600  # seconds; soil composition for a place doesn't change week to week
+    # Canned answer used when the API call fails; never cached
+    FALLBACK_RESEARCH = "Soil type is loam with pH 6.5. Nitrogen, phosphorus, and potassium levels are moderate. No heavy metal contamination detected. Contamination risk is low. Health implications are minimal."
+    
+    # Keyword groups for _extract_soil_parameters; each alternation is one scan of the text
+    PH_RE = re.compile(r'ph\s*(?:of|is|:)?\s*(\d+\.?\d*)')
+    # Ordered: the first type found in the text wins
+    SOIL_TYPES = ("clay", "loam", "sandy", "silt", "peat", "chalk", "alluvial", "laterite", "red", "black")
+    NUTRIENTS = ("nitrogen", "phosphorus", "potassium")
+    HEAVY_METALS = ("lead", "arsenic", "mercury", "cadmium")
+    HIGH_LEVEL_RE = re.compile(r"high|rich|abundant")
+    LOW_LEVEL_RE = re.compile(r"low|deficient|poor")
+    METAL_ELEVATED_RE = re.compile(r"contamination|elevated|high|concern")
+    METAL_SAFE_RE = re.compile(r"low|minimal|safe")
+    CONTAMINATION_RE = re.compile(r"contamination|pollution|toxic|hazardous")
+    ELEVATED_LEVELS = frozenset(("elevated", "high"))
+    METAL_IMPLICATIONS = {
+        "lead": "Elevated lead levels pose neurological and developmental risks, especially for children",
+        "arsenic": "Arsenic contamination increases cancer risk and skin lesion formation",
+        "mercury": "Mercury exposure can cause neurological damage and kidney problems",
+    }
+    
+    # Only the location varies between prompts
+    PROMPT_TEMPLATE = (
+        "Research soil conditions and health impacts for {location}. "
+        "Provide factual, structured information on:\n"
+        "1. Soil type and composition\n"
+        "2. Nutrient levels (nitrogen, phosphorus, potassium)\n"
+        "3. Soil pH\n"
+        "4. Heavy metal contamination risks (lead, arsenic, mercury)\n"
+        "5. Salinity or other contamination indicators\n"
+        "6. Potential health impacts from soil exposure\n\n"
+        "If specific data is not available, clearly state 'unknown' or 'data not available'."
+    ).format
     
     def __init__(self):
         self.api_key = settings.OPENAI_API_KEY
+        self._headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        # Research results keyed on (~10 km cell, city, state, country); regional answers
+        # don't change between neighbouring streets
+        self._cache = TTLCache(maxsize=4096, ttl=self.CACHE_TTL)
+        # Concurrent misses for the same key share one OpenAI call
+        self._inflight = SingleFlight()
     
     async def research_soil_data(
         self, 
@@ -26,7 +73,8 @@ class PerplexitySoilService:
         longitude: float,
         city: str = None,
         state: str = None,
-        country: str = None
+        country: str = None,
+        fallback: bool = True
     ) -> Dict:
         """
         Research soil data for a location using Perplexity AI
@@ -37,34 +85,31 @@ class PerplexitySoilService:
             city: City name (optional)
             state: State/region name (optional)
             country: Country name (optional)
+            fallback: On upstream errors, return generic research instead of raising
             
         Returns:
             dict: Structured soil data with health implications
         """
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY is required for soil research")
+
+        cell_lat, cell_lon = round(latitude, 1), round(longitude, 1)
+        cache_key = (cell_lat, cell_lon, city, state, country)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return {**cached, "coordinates": {"latitude": latitude, "longitude": longitude}}
         
-        # Build location descriptor
-        location_parts = []
-        if city:
-            location_parts.append(city)
-        if state:
-            location_parts.append(state)
-        if country:
-            location_parts.append(country)
-        
-        location_str = ", ".join(location_parts) if location_parts else f"coordinates {latitude}, {longitude}"
-        
-        # Construct research queries
-        queries = [
-            f"What is the soil composition and type in {location_str}?",
-            f"What are the nitrogen, phosphorus, and potassium levels in soil around {location_str}?",
-            f"What is the soil pH and are there any heavy metal contamination concerns (lead, arsenic, mercury) in {location_str}?",
-            f"What are potential health impacts from soil conditions in {location_str}?"
-        ]
+        # Build location descriptor (from the cell, since the result is shared across it)
+        location_str = ", ".join(p for p in (city, state, country) if p) or f"coordinates {cell_lat}, {cell_lon}"
         
         # Query OpenAI
-        raw_response = await self._query_openai(queries, location_str)
+        try:
+            raw_response = await self._inflight.run(cache_key, lambda: self._query_openai(location_str))
+        except Exception as e:
+            if not fallback:
+                raise
+            logger.warning("OpenAI API error for soil research: %s. Returning mock data.", e)
+            raw_response = self.FALLBACK_RESEARCH
         
         # Extract structured data
         soil_data = self._extract_soil_parameters(raw_response, location_str)
@@ -72,7 +117,7 @@ class PerplexitySoilService:
         # Add health implications
         health_implications = self._generate_health_implications(soil_data)
         
-        return {
+        result = {
             "location": location_str,
             "coordinates": {
                 "latitude": latitude,
@@ -90,36 +135,20 @@ class PerplexitySoilService:
             "raw_research": raw_response,
             "data_source": "openai"
         }
+        if raw_response is not self.FALLBACK_RESEARCH:
+            self._cache[cache_key] = result
+        return result
     
-    async def _query_openai(self, queries: List[str], location: str) -> str:
+    async def _query_openai(self, location: str) -> str:
         """
         Query OpenAI API with combined soil research questions
         
         Args:
-            queries: List of research questions
             location: Location descriptor
             
         Returns:
             str: Combined AI response text
         """
-        # Combine queries into a comprehensive prompt
-        combined_query = (
-            f"Research soil conditions and health impacts for {location}. "
-            f"Provide factual, structured information on:\n"
-            f"1. Soil type and composition\n"
-            f"2. Nutrient levels (nitrogen, phosphorus, potassium)\n"
-            f"3. Soil pH\n"
-            f"4. Heavy metal contamination risks (lead, arsenic, mercury)\n"
-            f"5. Salinity or other contamination indicators\n"
-            f"6. Potential health impacts from soil exposure\n\n"
-            f"If specific data is not available, clearly state 'unknown' or 'data not available'."
-        )
-        
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "model": "gpt-4o-mini",
             "messages": [
@@ -129,37 +158,29 @@ class PerplexitySoilService:
                 },
                 {
                     "role": "user",
-                    "content": combined_query
+                    "content": self.PROMPT_TEMPLATE(location=location)
                 }
             ],
             "temperature": 0.2,
             "max_tokens": 1000
         }
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.BASE_URL,
-                    headers=headers,
-                    json=payload,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                print(f"OpenAI soil response received")
-            
-            # Extract response text
-            if "choices" in data and len(data["choices"]) > 0:
-                return data["choices"][0]["message"]["content"]
-            else:
-                raise ValueError("Unexpected OpenAI API response format")
-                
-        except Exception as e:
-            print(f"OpenAI API error for soil research: {e}. Returning mock data.")
-            # Return mock response to prevent changing the rest of the flow too much for now, 
-            # ideally we'd return a structured fallback object directly.
-            return "Soil type is loam with pH 6.5. Nitrogen, phosphorus, and potassium levels are moderate. No heavy metal contamination detected. Contamination risk is low. Health implications are minimal."
+        response = await http_client.request(
+            "POST",
+            self.BASE_URL,
+            headers=self._headers,
+            content=orjson.dumps(payload),
+            timeout=30.0
+        )
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+
+        logger.debug("OpenAI soil response received for %s", location)
+
+        # Extract response text
+        if "choices" in data and len(data["choices"]) > 0:
+            return data["choices"][0]["message"]["content"]
+        raise ValueError("Unexpected OpenAI API response format")
     
     def _extract_soil_parameters(self, response_text: str, location: str) -> Dict:
         """
@@ -179,58 +200,46 @@ class PerplexitySoilService:
         text_lower = response_text.lower()
         
         # Extract soil type
-        soil_types = ["clay", "loam", "sandy", "silt", "peat", "chalk", "alluvial", "laterite", "red", "black"]
-        for soil_type in soil_types:
+        for soil_type in self.SOIL_TYPES:
             if soil_type in text_lower:
                 result["soil_type"] = soil_type
                 break
         
         # Extract pH (look for patterns like "pH 6.5" or "pH of 7.2")
-        ph_match = re.search(r'ph\s*(?:of|is|:)?\s*(\d+\.?\d*)', text_lower)
+        ph_match = self.PH_RE.search(text_lower)
         if ph_match:
             result["ph"] = float(ph_match.group(1))
         
         # Extract nutrient levels (nitrogen, phosphorus, potassium)
-        if "nitrogen" in text_lower:
-            if any(word in text_lower for word in ["high", "rich", "abundant"]):
-                result["nitrogen"] = "high"
-            elif any(word in text_lower for word in ["low", "deficient", "poor"]):
-                result["nitrogen"] = "low"
-            else:
-                result["nitrogen"] = "moderate"
-        
-        if "phosphorus" in text_lower:
-            if any(word in text_lower for word in ["high", "rich", "abundant"]):
-                result["phosphorus"] = "high"
-            elif any(word in text_lower for word in ["low", "deficient", "poor"]):
-                result["phosphorus"] = "low"
+        # The level words are matched against the whole text, so the level is
+        # the same for every nutrient mentioned; work it out once
+        nutrients = [n for n in self.NUTRIENTS if n in text_lower]
+        if nutrients:
+            if self.HIGH_LEVEL_RE.search(text_lower):
+                level = "high"
+            elif self.LOW_LEVEL_RE.search(text_lower):
+                level = "low"
             else:
-                result["phosphorus"] = "moderate"
+                level = "moderate"
+            for nutrient in nutrients:
+                result[nutrient] = level
         
-        if "potassium" in text_lower:
-            if any(word in text_lower for word in ["high", "rich", "abundant"]):
-                result["potassium"] = "high"
-            elif any(word in text_lower for word in ["low", "deficient", "poor"]):
-                result["potassium"] = "low"
-            else:
-                result["potassium"] = "moderate"
-        
-        # Extract heavy metals
+        # Extract heavy metals (same whole-text rule as nutrients)
         heavy_metals = {}
-        for metal in ["lead", "arsenic", "mercury", "cadmium"]:
-            if metal in text_lower:
-                if any(word in text_lower for word in ["contamination", "elevated", "high", "concern"]):
-                    heavy_metals[metal] = "elevated"
-                elif any(word in text_lower for word in ["low", "minimal", "safe"]):
-                    heavy_metals[metal] = "safe"
-                else:
-                    heavy_metals[metal] = "present"
+        metals = [m for m in self.HEAVY_METALS if m in text_lower]
+        if metals:
+            if self.METAL_ELEVATED_RE.search(text_lower):
+                status = "elevated"
+            elif self.METAL_SAFE_RE.search(text_lower):
+                status = "safe"
+            else:
+                status = "present"
+            heavy_metals = dict.fromkeys(metals, status)
         
         result["heavy_metals"] = heavy_metals
         
         # Assess contamination risk
-        contamination_keywords = ["contamination", "pollution", "toxic", "hazardous"]
-        if any(keyword in text_lower for keyword in contamination_keywords):
+        if self.CONTAMINATION_RE.search(text_lower):
             result["contamination_risk"] = "high"
         elif heavy_metals:
             result["contamination_risk"] = "medium"
@@ -261,12 +270,10 @@ class PerplexitySoilService:
         
         # Heavy metal implications
         heavy_metals = soil_data.get("heavy_metals", {})
-        if "lead" in heavy_metals and heavy_metals["lead"] in ["elevated", "high"]:
-            implications.append("Elevated lead levels pose neurological and developmental risks, especially for children")
-        if "arsenic" in heavy_metals and heavy_metals["arsenic"] in ["elevated", "high"]:
-            implications.append("Arsenic contamination increases cancer risk and skin lesion formation")
-        if "mercury" in heavy_metals and heavy_metals["mercury"] in ["elevated", "high"]:
-            implications.append("Mercury exposure can cause neurological damage and kidney problems")
+        implications.extend(
+            message for metal, message in self.METAL_IMPLICATIONS.items()
+            if heavy_metals.get(metal) in self.ELEVATED_LEVELS
+        )
         
         # Contamination risk implications
         contamination_risk = soil_data.get("contamination_risk", "low")
@@ -0,0 +1,24 @@
+"""
+Single Flight
+Coalesces concurrent identical upstream calls so only one request is in flight per key
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Callers with the same key while a call is running await that call instead of starting another"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Return factory()'s result, sharing it with any concurrent caller using the same key"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller timing out doesn't cancel the call for the others
+        return await asyncio.shield(task)
@@ -4,8 +4,10 @@ Business logic for soil and environmental data
 """
 
 import random
+from functools import lru_cache
 from typing import List
 from app.schemas.soil import SoilProperties, SoilDataResponse
+from app.services.air_quality_service import CITY_BOUNDS
 
 
 class SoilService:
@@ -45,28 +47,8 @@ class SoilService:
         )
     
     def _generate_mock_soil_properties(self, lat: float, lon: float) -> SoilProperties:
-        """Generate realistic mock soil properties"""
-        seed = int((abs(lat) + abs(lon)) * 1000)
-        random.seed(seed)
-        
-        soil_type = random.choice(self.SOIL_TYPES)
-        ph = round(random.uniform(5.5, 8.0), 1)
-        organic_matter = round(random.uniform(1.0, 6.0), 1)
-        
-        # Determine contamination risk based on location
-        # Higher risk near urban centers (simplified)
-        urban_proximity = abs(lat - 40.7) + abs(lon + 74)  # Distance from NYC
-        if urban_proximity < 1:
-            contamination_risk = random.choice(["medium", "high"])
-        else:
-            contamination_risk = random.choice(["low", "medium"])
-        
-        return SoilProperties(
-            soil_type=soil_type,
-            ph=ph,
-            organic_matter=organic_matter,
-            contamination_risk=contamination_risk
-        )
+        """Generate realistic mock soil properties (shared per ~10 m cell, do not mutate)"""
+        return _mock_soil_properties(round(lat, 4), round(lon, 4))
     
     def _analyze_health_impacts(self, properties: SoilProperties) -> List[str]:
         """Analyze health impacts based on soil properties"""
@@ -132,12 +114,35 @@ class SoilService:
     
     def _get_location_name(self, lat: float, lon: float) -> str:
         """Get location name - mock implementation"""
-        if 40 <= lat <= 41 and -75 <= lon <= -73:
-            return "New York, NY"
-        elif 34 <= lat <= 35 and -119 <= lon <= -117:
-            return "Los Angeles, CA"
-        else:
-            return f"Location ({lat:.2f}, {lon:.2f})"
+        for lat_lo, lat_hi, lon_lo, lon_hi, name in CITY_BOUNDS:
+            if lat_lo <= lat <= lat_hi and lon_lo <= lon <= lon_hi:
+                return name
+        return f"Location ({lat:.2f}, {lon:.2f})"
+
+
+@lru_cache(maxsize=4096)
+def _mock_soil_properties(lat: float, lon: float) -> SoilProperties:
+    """Seeded mock soil properties; a local RNG leaves the global random state alone"""
+    rng = random.Random(int((abs(lat) + abs(lon)) * 1000))
+    
+    soil_type = rng.choice(SoilService.SOIL_TYPES)
+    ph = round(rng.uniform(5.5, 8.0), 1)
+    organic_matter = round(rng.uniform(1.0, 6.0), 1)
+    
+    # Determine contamination risk based on location
+    # Higher risk near urban centers (simplified)
+    urban_proximity = abs(lat - 40.7) + abs(lon + 74)  # Distance from NYC
+    if urban_proximity < 1:
+        contamination_risk = rng.choice(["medium", "high"])
+    else:
+        contamination_risk = rng.choice(["low", "medium"])
+    
+    return SoilProperties(
+        soil_type=soil_type,
+        ph=ph,
+        organic_matter=organic_matter,
+        contamination_risk=contamination_risk
+    )
 
 
 # Singleton instance
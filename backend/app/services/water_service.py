@@ -3,23 +3,53 @@ Water Quality Service
 Uses Perplexity AI to research water quality for a location
 """
 
-import httpx
-import json
+import logging
 import re
 import random
+import orjson
+from functools import lru_cache
 from typing import Dict, List, Optional
+from cachetools import TTLCache
 from app.config import get_settings
+from app.services.http_client import http_client
+from app.services.single_flight import SingleFlight
 from app.schemas.water import WaterDataResponse
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 class WaterQualityService:
     """Service for researching water quality using Perplexity AI"""
     
     BASE_URL = "https://api.perplexity.ai/chat/completions"
+    CACHE_TTL = 86400  # seconds; research answers for a place don't change day to day
+    PH_RE = re.compile(r'ph\s*(?:of|is|:)?\s*(\d+\.?\d*)')
+    HIGH_RISK_RE = re.compile(r"unsafe|boil|contaminated|avoid")
+    MEDIUM_RISK_RE = re.compile(r"caution|filter|moderate")
+    
+    # Only the location varies between queries
+    QUERY_TEMPLATE = (
+        "Conduct a comprehensive ChildSafeEnviro analysis for water quality in {location}. "
+        "Provide a detailed, factual report covering: "
+        "1. Specific water sources and their current status (aquifers, reservoirs, rivers). "
+        "2. Recent water quality reports, violation history, and specific contaminants (e.g., PFAS, lead, arsenic, nitrates, microplastics). "
+        "3. Hardness, pH, and mineral content. "
+        "4. localized health risks or advisories (e.g., boil notices, industrial runoff). "
+        "5. Comparison with national safety standards. "
+        "Maximize the depth of information regarding potential health effects."
+    ).format
     
     def __init__(self):
         self.api_key = settings.PERPLEXITY_API_KEY
+        self._headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        # Research results keyed on (~10 km cell, city, state, country); regional answers
+        # don't change between neighbouring streets
+        self._cache = TTLCache(maxsize=4096, ttl=self.CACHE_TTL)
+        # Concurrent misses for the same key share one Perplexity call
+        self._inflight = SingleFlight()
     
     async def get_water_quality(
         self, 
@@ -27,64 +57,59 @@ class WaterQualityService:
         longitude: float,
         city: str = None,
         state: str = None,
-        country: str = None
+        country: str = None,
+        fallback: bool = True
     ) -> Dict:
         """
         Get water quality data (Research or Mock)
+        With fallback=False, research errors are raised instead of answered with mock data
         """
+        if not self.api_key:
+            return self._generate_mock_water_data(latitude, longitude, city, state, country)
         try:
-            if self.api_key:
-                return await self._research_water_data(latitude, longitude, city, state, country)
-            else:
-                return self._generate_mock_water_data(latitude, longitude, city, state, country)
+            return await self._research_water_data(latitude, longitude, city, state, country)
         except Exception as e:
-            print(f"Water research failed ({e}), falling back to mock data.")
+            if not fallback:
+                raise
+            logger.warning("Water research failed (%s), falling back to mock data.", e)
             return self._generate_mock_water_data(latitude, longitude, city, state, country)
 
     async def _research_water_data(self, latitude, longitude, city, state, country) -> Dict:
-        # Build location string
-        location_parts = [p for p in [city, state, country] if p]
-        location_str = ", ".join(location_parts) if location_parts else f"{latitude}, {longitude}"
-        
-        query = (
-            f"Conduct a comprehensive ChildSafeEnviro analysis for water quality in {location_str}. "
-            f"Provide a detailed, factual report covering: "
-            f"1. Specific water sources and their current status (aquifers, reservoirs, rivers). "
-            f"2. Recent water quality reports, violation history, and specific contaminants (e.g., PFAS, lead, arsenic, nitrates, microplastics). "
-            f"3. Hardness, pH, and mineral content. "
-            f"4. localized health risks or advisories (e.g., boil notices, industrial runoff). "
-            f"5. Comparison with national safety standards. "
-            f"Maximize the depth of information regarding potential health effects."
-        )
+        cell_lat, cell_lon = round(latitude, 1), round(longitude, 1)
+        cache_key = (cell_lat, cell_lon, city, state, country)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return {**cached, "coordinates": {"latitude": latitude, "longitude": longitude}}
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        # Build location string (from the cell, since the result is shared across it)
+        location_str = ", ".join(p for p in (city, state, country) if p) or f"{cell_lat}, {cell_lon}"
         
         payload = {
             "model": "sonar",
             "messages": [
                 {"role": "system", "content": "You are a water quality expert. JSON response only."},
-                {"role": "user", "content": query}
+                {"role": "user", "content": self.QUERY_TEMPLATE(location=location_str)}
             ],
             "max_tokens": 800
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(self.BASE_URL, headers=headers, json=payload, timeout=30.0)
-            response.raise_for_status()
-            data = response.json()
-            content = data["choices"][0]["message"]["content"]
-            
-            return self._parse_research_result(content, location_str, latitude, longitude)
+        response = await self._inflight.run(cache_key, lambda: http_client.request(
+            "POST", self.BASE_URL, headers=self._headers, content=orjson.dumps(payload), timeout=30.0
+        ))
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        content = data["choices"][0]["message"]["content"]
+
+        result = self._parse_research_result(content, location_str, latitude, longitude)
+        self._cache[cache_key] = result
+        return result
 
     def _parse_research_result(self, text: str, location: str, lat: float, lon: float) -> Dict:
         # Simple extraction logic (NLP would be better, but regex works for basic MVP)
         text_lower = text.lower()
         
         # pH
-        ph_match = re.search(r'ph\s*(?:of|is|:)?\s*(\d+\.?\d*)', text_lower)
+        ph_match = self.PH_RE.search(text_lower)
         ph = float(ph_match.group(1)) if ph_match else 7.0
         
         # Hardness
@@ -94,9 +119,9 @@ class WaterQualityService:
         
         # Risk
         risk = "low"
-        if any(x in text_lower for x in ["unsafe", "boil", "contaminated", "avoid"]):
+        if self.HIGH_RISK_RE.search(text_lower):
             risk = "high"
-        elif any(x in text_lower for x in ["caution", "filter", "moderate"]):
+        elif self.MEDIUM_RISK_RE.search(text_lower):
             risk = "medium"
             
         return {
@@ -114,13 +139,7 @@ class WaterQualityService:
 
     def _generate_mock_water_data(self, lat, lon, city, state, country) -> Dict:
         # Deterministic mock based on coords
-        seed = int((abs(lat) + abs(lon)) * 1000)
-        random.seed(seed)
-        
-        risks = ["low", "low", "low", "medium", "high"] # mostly low
-        risk = random.choice(risks)
-        
-        ph = round(random.uniform(6.5, 8.5), 1)
+        risk, ph, source_type, hardness = _mock_water_values(int((abs(lat) + abs(lon)) * 1000))
         
         recommendations = ["Stay hydrated"]
         if risk == "medium":
@@ -131,9 +150,9 @@ class WaterQualityService:
         return {
             "location": city or "Unknown Location",
             "coordinates": {"latitude": lat, "longitude": lon},
-            "source_type": random.choice(["Municipal Supply", "Groundwater", "Surface Water"]),
+            "source_type": source_type,
             "ph": ph,
-            "hardness": random.choice(["Soft", "Moderate", "Hard"]),
+            "hardness": hardness,
             "contamination_risk": risk,
             "health_implications": [f"Water quality risk is deemed {risk} based on regional patterns."],
             "recommendations": recommendations,
@@ -141,4 +160,13 @@ class WaterQualityService:
             "data_source": "mock_generated"
         }
 
+@lru_cache(maxsize=4096)
+def _mock_water_values(seed: int) -> tuple:
+    """Seeded (risk, ph, source_type, hardness); a local RNG leaves the global random state alone"""
+    rng = random.Random(seed)
+    risk = rng.choice(("low", "low", "low", "medium", "high"))  # mostly low
+    ph = round(rng.uniform(6.5, 8.5), 1)
+    return risk, ph, rng.choice(("Municipal Supply", "Groundwater", "Surface Water")), rng.choice(("Soft", "Moderate", "Hard"))
+
+
 water_service = WaterQualityService()
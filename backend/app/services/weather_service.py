@@ -3,29 +3,47 @@ Weather Service
 Fetches real-time weather data from OpenWeather API
 """
 
-import httpx
+import logging
+import random
+import time
+import orjson
+from functools import lru_cache
 from typing import Optional
+from cachetools import TTLCache
 from app.config import get_settings
+from app.services.http_client import http_client
+from app.services.single_flight import SingleFlight
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 class WeatherService:
     """Service for fetching weather data from OpenWeather API"""
     
     BASE_URL = "https://api.openweathermap.org/data/2.5"
+    CACHE_TTL = 600  # seconds; OpenWeather updates current conditions about every 10 minutes
     
     def __init__(self):
         self.api_key = settings.OPENWEATHER_API_KEY
+        # Real readings keyed on coordinates rounded to ~1 km
+        self._cache = TTLCache(maxsize=4096, ttl=self.CACHE_TTL)
+        # Concurrent misses for the same cell share one OpenWeather call
+        self._inflight = SingleFlight()
     
     async def get_weather(self, latitude: float, longitude: float) -> dict:
         """
         Get current weather data from OpenWeather API or Fallback
         """
         if not self.api_key:
-            print("OpenWeather API key not configured. Using mock data.")
+            logger.debug("OpenWeather API key not configured. Using mock data.")
             return self._generate_mock_weather(latitude, longitude)
         
+        cache_key = (round(latitude, 2), round(longitude, 2))
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return {**cached, "latitude": latitude, "longitude": longitude}
+
         url = f"{self.BASE_URL}/weather"
         params = {
             "lat": latitude,
@@ -35,18 +53,19 @@ class WeatherService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, timeout=10.0)
-                
-                if response.status_code == 401:
-                    print("Invalid OpenWeather API key. Falling back to mock data.")
-                    return self._generate_mock_weather(latitude, longitude)
-                
-                response.raise_for_status()
-                data = response.json()
-            
+            response = await self._inflight.run(
+                cache_key, lambda: http_client.request("GET", url, params=params, timeout=10.0)
+            )
+
+            if response.status_code == 401:
+                logger.warning("Invalid OpenWeather API key. Falling back to mock data.")
+                return self._generate_mock_weather(latitude, longitude)
+
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+
             # Normalize response for frontend
-            return {
+            weather = {
                 "latitude": latitude,
                 "longitude": longitude,
                 "location_name": data.get("name", "Unknown"),
@@ -63,41 +82,55 @@ class WeatherService:
                 "timestamp": data["dt"],
                 "data_source": "openweather"
             }
-            
+            self._cache[cache_key] = weather
+            return weather
+
         except Exception as e:
-            print(f"Weather API failed ({e}). Falling back to mock data.")
+            logger.warning("Weather API failed (%s). Falling back to mock data.", e)
             return self._generate_mock_weather(latitude, longitude)
 
     def _generate_mock_weather(self, lat: float, lon: float) -> dict:
         """Generate realistic mock weather data"""
-        import random
-        import time
-        
         # Deterministic based on location
-        random.seed(int((abs(lat) + abs(lon)) * 100))
-        
-        temp = round(random.uniform(10, 30), 1)
-        conditions = ["Clear", "Clouds", "Rain", "Mist"]
-        condition = random.choice(conditions)
+        temp, condition, feels_like, humidity, wind_speed, wind_direction, clouds = _mock_weather_values(
+            int((abs(lat) + abs(lon)) * 100)
+        )
         
         return {
             "latitude": lat,
             "longitude": lon,
             "location_name": f"Location ({lat:.2f}, {lon:.2f})",
             "temperature": temp,
-            "feels_like": round(temp + random.uniform(-2, 2), 1),
-            "humidity": random.randint(30, 90),
+            "feels_like": feels_like,
+            "humidity": humidity,
             "pressure": 1013,
-            "wind_speed": round(random.uniform(0, 15), 1),
-            "wind_direction": random.randint(0, 360),
+            "wind_speed": wind_speed,
+            "wind_direction": wind_direction,
             "weather_condition": condition,
             "weather_description": f"{condition.lower()} and breezy",
-            "clouds": random.randint(0, 100),
+            "clouds": clouds,
             "visibility": 10000,
             "timestamp": int(time.time()),
             "data_source": "mock"
         }
 
 
+@lru_cache(maxsize=4096)
+def _mock_weather_values(seed: int) -> tuple:
+    """Seeded mock readings; a local RNG so the global random state is left alone"""
+    rng = random.Random(seed)
+    temp = round(rng.uniform(10, 30), 1)
+    condition = rng.choice(("Clear", "Clouds", "Rain", "Mist"))
+    return (
+        temp,
+        condition,
+        round(temp + rng.uniform(-2, 2), 1),
+        rng.randint(30, 90),
+        round(rng.uniform(0, 15), 1),
+        rng.randint(0, 360),
+        rng.randint(0, 100),
+    )
+
+
 # Singleton instance
 weather_service = WeatherService()
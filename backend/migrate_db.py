@@ -4,14 +4,29 @@ import os
 db_path = os.path.join(os.path.dirname(__file__), "envhealth.db")
 
 if os.path.exists(db_path):
-    conn = sqlite3.connect(db_path)
+    # Autocommit mode plus an explicit BEGIN so the column and both indexes
+    # land in one transaction (one journal sync instead of one per statement)
+    conn = sqlite3.connect(db_path, isolation_level=None)
     cur = conn.cursor()
-    try:
+    cur.execute("BEGIN")
+    # Probe the columns once rather than relying on a duplicate-column error,
+    # so a missing table still fails loudly
+    existing = {row[1] for row in cur.execute("PRAGMA table_info(lifestyle_data)")}
+    if "child_age_range" not in existing:
         cur.execute("ALTER TABLE lifestyle_data ADD COLUMN child_age_range VARCHAR")
-        conn.commit()
         print("Successfully added child_age_range column.")
-    except sqlite3.OperationalError as e:
-        print(f"Error (maybe column exists): {e}")
+    else:
+        print("child_age_range column already exists.")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS ix_envdata_latlon "
+        "ON environmental_data (latitude, longitude)"
+    )
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_hr_stripe_session_id "
+        "ON health_reports (stripe_session_id)"
+    )
+    cur.execute("COMMIT")
+    print("Ensured ix_envdata_latlon and ix_hr_stripe_session_id indexes.")
     conn.close()
 else:
     print(f"DB not found at {db_path}")
@@ -1,8 +1,14 @@
 """
 Machine Learning Module
-Placeholder for future ML-based health prediction models
+ML-based health prediction models (requires the optional scikit-learn install)
 """
 
+from operator import itemgetter
+
+# scikit-learn, numpy and joblib are optional (commented out in requirements.txt) and
+# only imported when a model is trained, used or persisted, so importing ml never needs them
+ML_INSTALL_HINT = "install the ML packages listed at the end of backend/requirements.txt"
+
 # Future ML Features:
 # - Train models on collected environmental + lifestyle + health outcome data
 # - Predict long-term health risks using regression/classification
@@ -22,33 +28,77 @@ Placeholder for future ML-based health prediction models
 
 class HealthPredictionModel:
     """
-    Placeholder for ML-based health prediction
+    ML-based health prediction
     Will replace rule-based scoring with trained models
     """
     
     def __init__(self):
-        self.model = None
-        self.scaler = None
-        self.feature_names = []
+        self.pipeline = None
+        self.feature_names = MODEL_FEATURE_NAMES
     
     def train(self, X, y):
-        """Train model on collected data"""
-        # TODO: Implement training pipeline
-        # from sklearn.ensemble import RandomForestClassifier
-        # self.model = RandomForestClassifier()
-        # self.model.fit(X, y)
-        pass
+        """
+        Train model on collected data
+        X is a (n_samples, n_features) array in MODEL_FEATURE_NAMES order (see schema_records_to_matrix)
+        """
+        try:
+            from sklearn.compose import ColumnTransformer
+            from sklearn.ensemble import RandomForestClassifier
+            from sklearn.pipeline import Pipeline
+            from sklearn.preprocessing import StandardScaler
+        except ImportError as e:
+            raise ImportError(f"Training needs scikit-learn: {ML_INSTALL_HINT}") from e
+        
+        # Continuous readings are scaled; encoded categories pass through unchanged
+        num_cols = [i for i, kind in enumerate(FEATURE_SCHEMA.values()) if kind == "float"]
+        cat_cols = [i for i, kind in enumerate(FEATURE_SCHEMA.values()) if kind != "float"]
+        self.pipeline = Pipeline([
+            ("prep", ColumnTransformer([
+                ("num", StandardScaler(), num_cols),
+                ("cat", "passthrough", cat_cols)
+            ])),
+            ("rf", RandomForestClassifier(n_estimators=200, n_jobs=-1))
+        ])
+        self.pipeline.fit(X, y)
+        return self
     
     def predict(self, features):
-        """Predict health risk from features"""
-        # TODO: Implement prediction
-        # return self.model.predict(features)
-        pass
+        """Predict health risk for a (batch, n_features) array in one vectorized call"""
+        if self.pipeline is None:
+            raise RuntimeError("HealthPredictionModel has not been trained or loaded")
+        return self.pipeline.predict(features)
+    
+    def save(self, path):
+        """Persist the fitted pipeline"""
+        _joblib().dump(self.pipeline, path, compress=3)
     
-    def explain_prediction(self, features):
-        """Explain prediction using SHAP or LIME"""
-        # TODO: Implement explainability
-        pass
+    def load(self, path):
+        """Load a pipeline saved with save()"""
+        self.pipeline = _joblib().load(path)
+        return self
+    
+    def feature_importances(self):
+        """
+        Global importance of each feature, highest first
+        The ColumnTransformer emits scaled floats before passthrough ints, so the
+        forest's importances are mapped back to names in that order
+        """
+        if self.pipeline is None:
+            raise RuntimeError("HealthPredictionModel has not been trained or loaded")
+        kinds = FEATURE_SCHEMA.items()
+        ordered = [name for name, kind in kinds if kind == "float"] + \
+                  [name for name, kind in kinds if kind != "float"]
+        importances = self.pipeline.named_steps["rf"].feature_importances_
+        return dict(sorted(zip(ordered, importances.tolist()), key=lambda item: item[1], reverse=True))
+
+
+def _joblib():
+    """joblib ships with scikit-learn; import it lazily with the same install hint"""
+    try:
+        import joblib
+    except ImportError as e:
+        raise ImportError(f"Saving/loading models needs joblib: {ML_INSTALL_HINT}") from e
+    return joblib
 
 
 # Example feature vector format for future ML:
@@ -79,5 +129,23 @@ FEATURE_SCHEMA = {
     "combined_risk_index": "float"
 }
 
+# Column order of the future model's input, shared by training and inference.
+# Not the stored report feature_vector: that is HealthReportService.FEATURE_NAMES
+# (5 values), while model rows need every FEATURE_SCHEMA key, including the
+# *_encoded lifestyle codes that a future encoder will produce
+MODEL_FEATURE_NAMES = tuple(FEATURE_SCHEMA)
+_model_feature_row = itemgetter(*MODEL_FEATURE_NAMES)
+
+
+def schema_records_to_matrix(records):
+    """
+    Pack FEATURE_SCHEMA dicts into a contiguous (n_records, n_features) float32 array
+    Columns follow MODEL_FEATURE_NAMES; int-encoded features are stored as floats
+    """
+    import numpy as np
+    rows = [_model_feature_row(r) for r in records]
+    return np.array(rows, dtype=np.float32).reshape(len(rows), len(MODEL_FEATURE_NAMES))
+
+
 # Target variable:
 # "health_outcome": Binary (healthy/at-risk) or continuous (0-100 risk score)